@@ -0,0 +1,84 @@
+import math
+from collections import defaultdict
+from typing import Dict, Tuple
+
+
+def wilson_interval(correct: int, total: int, z: float = 1.96) -> Tuple[float, float]:
+    if total == 0:
+        return 0.0, 1.0
+    p = correct / total
+    denominator = 1 + z * z / total
+    centre = (p + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+class AdaptiveSampler:
+    """Sequential sampling that stops a (model, benchmark) pair once its score is settled.
+
+    Questions are drawn in batches from the same randomly ordered sample for
+    every model. Before each batch the pair's Wilson interval is checked: the
+    pair stops once the interval is narrower than `target_width`, or once it no
+    longer overlaps the intervals of the models ranked directly above and below
+    it on that benchmark. Models near 0% or 100% settle after a few batches,
+    while close races keep drawing up to the sample cap.
+    """
+
+    def __init__(self, target_width: float = 0.1, batch_size: int = 20, min_samples: int = 20, z: float = 1.96):
+        self.target_width = target_width
+        self.batch_size = batch_size
+        self.min_samples = min_samples
+        self.z = z
+        self.correct = defaultdict(int)
+        self.total = defaultdict(int)
+        self.stopped = {}
+
+    def seed(self, counts: Dict[Tuple[str, str], Tuple[int, int]]):
+        # Results of an interrupted run count towards the stopping rule
+        for key, (correct, total) in counts.items():
+            self.correct[key] += correct
+            self.total[key] += total
+
+    def record(self, model: str, benchmark: str, correct: bool):
+        self.correct[(model, benchmark)] += int(correct)
+        self.total[(model, benchmark)] += 1
+
+    def interval(self, model: str, benchmark: str) -> Tuple[float, float]:
+        key = (model, benchmark)
+        return wilson_interval(self.correct[key], self.total[key], self.z)
+
+    def should_stop(self, model: str, benchmark: str) -> bool:
+        key = (model, benchmark)
+        if key in self.stopped:
+            return True
+        if self.total[key] < self.min_samples:
+            return False
+
+        low, high = self.interval(model, benchmark)
+        if high - low <= self.target_width:
+            reason = f"interval width {high - low:.3f}"
+        elif self._ranking_decided(model, benchmark, low, high):
+            reason = "ranking against neighbours decided"
+        else:
+            return False
+        self.stopped[key] = reason
+        print(f"Stopping {model} on {benchmark} after {self.total[key]} questions: {reason}")
+        return True
+
+    def _ranking_decided(self, model: str, benchmark: str, low: float, high: float) -> bool:
+        estimate = self.correct[(model, benchmark)] / self.total[(model, benchmark)]
+        others = sorted(
+            (self.correct[key] / self.total[key], key[0])
+            for key in self.total
+            if key[1] == benchmark and key[0] != model and self.total[key]
+        )
+        below = [other for other in others if other[0] <= estimate][-1:]
+        above = [other for other in others if other[0] > estimate][:1]
+        neighbours = below + above
+        if not neighbours:
+            return False
+        for _, other_model in neighbours:
+            other_low, other_high = self.interval(other_model, benchmark)
+            if other_low <= high and low <= other_high:
+                return False
+        return True
@@ -0,0 +1,117 @@
+import re
+from typing import List, Optional
+
+ANSWER_TAG_PATTERN = re.compile(r"\[answer\](.*?)\[/answer\]", re.IGNORECASE | re.DOTALL)
+# The closing tag must carry the same number, or none, and an answer cannot contain another opening tag, so an
+# unclosed answer is reported missing instead of swallowing the next one
+NUMBERED_ANSWER_TAG_PATTERN = re.compile(r"\[answer\s*(\d+)\]((?:(?!\[answer).)*?)\[/answer(?:\s*\1)?\]", re.IGNORECASE | re.DOTALL)
+BOXED_PATTERN = re.compile(r"\\(?:boxed|fbox)\s*\{")
+# Thousands groups may be separated by a comma, a dot, a space or a (narrow) no-break space, and the decimal mark may be a
+# dot or a comma, so "12 500", "12\u202f500", "1.234,5" and "1,5" are each a single number
+NUMBER = r"-?(?:\d{1,3}(?:[,. \u00a0\u202f]\d{3})+(?!\d)(?:[.,]\d+)?|\d+(?:[.,]\d+)?)|-?\.\d+"
+PLAIN_NUMBER_PATTERN = re.compile(rf"\s*({NUMBER})\s*\.?\s*")
+NUMBER_PATTERN = re.compile(NUMBER)
+GROUP_SPACES = str.maketrans("", "", " \u00a0\u202f")
+TEXT_COMMAND_PATTERN = re.compile(r"\\(?:text|textbf|mathrm|mbox)\s*\{([^{}]*)\}")
+FRAC_ALIAS_PATTERN = re.compile(r"\\[dt]frac")
+DEGREE_PATTERN = re.compile(r"\^\s*\{?\\circ\}?")
+SPACING_PATTERN = re.compile(r"\\[,!;:> ]|\\q?quad|\s+")
+SIZING_PATTERN = re.compile(r"\\(?:left|right|big|Big|bigg|Bigg)(?![a-zA-Z])")
+
+
+def extract_tagged_answer(response: Optional[str]) -> str:
+    if response is None:
+        return ""
+    match = ANSWER_TAG_PATTERN.search(response)
+    if match is None:
+        return response  # Return the full response if tags are not found
+    return match.group(1).strip()
+
+
+def extract_tagged_answers(responses: List[Optional[str]]) -> List[str]:
+    return [extract_tagged_answer(response) for response in responses]
+
+
+def extract_numbered_answers(response: Optional[str], count: int) -> List[Optional[str]]:
+    """Contents of the [answer i]...[/answer i] tags of a batched response, None where an answer is missing."""
+    answers = [None] * count
+    for match in NUMBERED_ANSWER_TAG_PATTERN.finditer(response or ""):
+        index = int(match.group(1)) - 1
+        if 0 <= index < count and answers[index] is None:
+            answers[index] = match.group(2).strip()
+    return answers
+
+
+def extract_boxed(text: Optional[str]) -> Optional[str]:
+    """Content of the last \\boxed{...} in `text`, matching nested braces."""
+    if not text:
+        return None
+    matches = list(BOXED_PATTERN.finditer(text))
+    if not matches:
+        return None
+    start = matches[-1].end()
+    depth = 1
+    for position in range(start, len(text)):
+        char = text[position]
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:position]
+    return None
+
+
+def normalize_latex(answer: Optional[str]) -> str:
+    if answer is None:
+        return ""
+    if "\\" not in answer and "$" not in answer and "%" not in answer:
+        return "".join(answer.split()).rstrip(".").lower()
+    boxed = extract_boxed(answer)
+    if boxed is not None:
+        answer = boxed
+    answer = answer.strip().strip("$").strip()
+    answer = TEXT_COMMAND_PATTERN.sub(r"\1", answer)
+    answer = FRAC_ALIAS_PATTERN.sub(r"\\frac", answer)
+    answer = DEGREE_PATTERN.sub("", answer)
+    answer = SIZING_PATTERN.sub("", answer)
+    answer = SPACING_PATTERN.sub("", answer)
+    answer = answer.replace("\\%", "").replace("%", "").replace("\\$", "")
+    return answer.rstrip(".").lower()
+
+
+def parse_number(token: str) -> float:
+    """Value of a number matched by NUMBER_PATTERN, whichever locale wrote it."""
+    spaced = token.translate(GROUP_SPACES)
+    grouped_by_spaces = len(spaced) != len(token)
+    comma, dot = spaced.rfind(","), spaced.rfind(".")
+    if comma != -1 and dot != -1:
+        # Both marks appear, the later one is the decimal mark
+        thousands, decimal = (",", ".") if dot > comma else (".", ",")
+        return float(spaced.replace(thousands, "").replace(decimal, "."))
+    if comma != -1:
+        # A lone comma followed by exactly three digits is a thousands separator unless spaces already group the digits
+        if spaced.count(",") == 1 and (grouped_by_spaces or len(spaced) - comma - 1 != 3):
+            return float(spaced.replace(",", "."))
+        return float(spaced.replace(",", ""))
+    if spaced.count(".") > 1:
+        return float(spaced.replace(".", ""))
+    return float(spaced)
+
+
+def normalize_number(text: Optional[str]) -> Optional[float]:
+    """Last number in `text` with thousands separators removed, or None."""
+    if not text:
+        return None
+    # Most tagged answers are a bare number, skip the scan over the full text
+    match = PLAIN_NUMBER_PATTERN.fullmatch(text)
+    if match is not None:
+        return parse_number(match.group(1))
+    matches = NUMBER_PATTERN.findall(text)
+    if not matches:
+        return None
+    return parse_number(matches[-1])
+
+
+def normalize_numbers(texts: List[Optional[str]]) -> List[Optional[float]]:
+    return [normalize_number(text) for text in texts]
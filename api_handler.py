@@ -1,39 +1,506 @@
 import os
+import json
+import time
+import random
 import asyncio
-from openai import AsyncOpenAI
-from aiolimiter import AsyncLimiter
+import email.utils
+import httpx
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from openai import AsyncOpenAI, APIConnectionError, APIError, APIResponseValidationError, APIStatusError, RateLimitError
+from response_cache import ResponseCache
+from telemetry import Telemetry
 
-def get_openrouter_client():
+# Streamed responses are cut off once this tag has arrived, the answer parsers never look past it
+ANSWER_CLOSE_TAG = "[/answer]"
+
+DEFAULT_BUDGETS = {
+    "model": {"max_concurrency": 8, "tokens_per_minute": None, "requests_per_minute": None},
+    "provider": {"max_concurrency": 32, "tokens_per_minute": None, "requests_per_minute": None},
+}
+# Starting point of the char->token model until a model's usage has been seen
+DEFAULT_CHARS_PER_TOKEN = 4.0
+# Backoff between retries grows from RETRY_BASE_DELAY up to RETRY_MAX_DELAY seconds, with jitter
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+# Client errors that say the model cannot be used at all rather than that the prompt was rejected
+MODEL_ERROR_STATUSES = {401, 402, 403, 404}
+
+def get_openrouter_client(http_client=None):
+    # http_client is usually HttpTransport.api_client(), the pooled keep-alive/HTTP/2 client
     client = AsyncOpenAI(
-        base_url="https://openrouter.ai/api/v1",
+        # Point OPENROUTER_BASE_URL at perf/mock_openrouter.py to benchmark the suite offline
+        base_url=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
         api_key=os.getenv("OPENROUTER_API_KEY"),
+        max_retries=0,  # Retries and 429 handling are done by RateLimitedClient
+        http_client=http_client,
     )
     return client
 
+async def fetch_openrouter_pricing(client) -> Dict[str, Dict[str, float]]:
+    # OpenRouter lists USD prices per prompt and completion token for every model
+    pricing = {}
+    try:
+        async for model in client.models.list():
+            prices = getattr(model, "pricing", None) or {}
+            pricing[model.id] = {"prompt": float(prices.get("prompt", 0)), "completion": float(prices.get("completion", 0))}
+    except Exception as e:
+        print(f"Could not fetch model pricing, costs will not be estimated: {e}")
+    return pricing
+
+def get_provider(model: str) -> str:
+    return model.split("/", 1)[0]
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def get_status_code(error: Exception) -> int:
+    return getattr(error, "status_code", 0) or 0
+
+class EmptyResponseError(Exception):
+    """A response without choices, OpenRouter returns these for some upstream failures."""
+
+def is_retryable(error: Exception) -> bool:
+    # Timeouts, dropped connections, 408, 409, 429 and 5xx can succeed on a second try, other 4xx will not
+    if isinstance(error, (APIConnectionError, httpx.TransportError, EmptyResponseError)):
+        return True
+    if isinstance(error, APIStatusError):
+        status = get_status_code(error)
+        return status in (408, 409, 429) or status >= 500
+    # An error event in the middle of a stream, OpenRouter sends these when the upstream provider fails
+    return isinstance(error, APIError) and not isinstance(error, APIResponseValidationError)
+
+def backoff_delay(attempt: int) -> float:
+    # Half of the exponential delay is fixed and half is random, so retries of concurrent requests spread out
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+class QueryError(Exception):
+    """A query that failed for good, either after its retries or with an error that is not retried."""
+
+    def __init__(self, model: str, message: str, status: int = 0):
+        super().__init__(f"{model}: {message}")
+        self.model = model
+        self.status = status
+
+class ModelUnavailableError(QueryError):
+    """Raised without sending a request while the model's circuit breaker is open."""
+
+class CircuitBreaker:
+    """Fails requests to a model fast once it keeps failing.
+
+    The breaker opens after `failure_threshold` consecutive attempts that
+    failed with a server error, a connection error or one of
+    MODEL_ERROR_STATUSES. While it is open every request raises
+    ModelUnavailableError. After `reset_timeout` seconds a single request is
+    let through as a probe, its outcome closes or reopens the breaker. A probe
+    that ends any other way hands the slot to the next request.
+    """
+
+    def __init__(self, model: str, failure_threshold: int = 8, reset_timeout: float = 120.0):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.probe_id = 0
+        self.last_error = None
+
+    def holds_probe(self, probe: Optional[int]) -> bool:
+        return probe is not None and self.probing and self.probe_id == probe
+
+    def check(self) -> Optional[int]:
+        # Returns an id when the caller is let through as the probe, its retries skip the check with holds_probe
+        if self.opened_at is None:
+            return None
+        if not self.probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.probing = True
+            self.probe_id += 1
+            return self.probe_id
+        raise ModelUnavailableError(self.model, f"circuit breaker open after {self.failures} consecutive failures, last error: {self.last_error}")
+
+    def record_success(self):
+        if self.opened_at is not None:
+            print(f"Circuit breaker for {self.model} closed, the model is answering again")
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def release_probe(self, probe: Optional[int]):
+        # The probe ended without a verdict on the model, e.g. rate limited, rejected prompt or cancelled
+        if self.holds_probe(probe):
+            self.probing = False
+
+    def record_failure(self, error: Exception):
+        self.failures += 1
+        self.last_error = str(error)
+        if self.probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+            if self.opened_at is None:
+                print(f"Circuit breaker for {self.model} opened after {self.failures} consecutive failures: {self.last_error}")
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+class TokenEstimator:
+    """Calibrated char->token model per (model, benchmark).
+
+    Prompt tokens are estimated from the prompt length and the characters per
+    token seen in earlier responses of the same model and benchmark, falling
+    back to the model's average and then to DEFAULT_CHARS_PER_TOKEN. The
+    expected completion length is learned the same way. Both are moving
+    averages of the `usage` the API reports.
+    """
+
+    def __init__(self, chars_per_token: float = DEFAULT_CHARS_PER_TOKEN, smoothing: float = 0.2):
+        self.default_chars_per_token = chars_per_token
+        self.smoothing = smoothing
+        # Keyed by (model, benchmark) and by (model, None) for the model's average
+        self.chars_per_token = {}
+        self.completion_tokens = {}
+
+    @staticmethod
+    def _lookup(table: dict, model: str, benchmark: str, default: float) -> float:
+        return table.get((model, benchmark), table.get((model, None), default))
+
+    def _update(self, table: dict, model: str, benchmark: str, value: float):
+        for key in ((model, benchmark), (model, None)):
+            previous = table.get(key)
+            table[key] = value if previous is None else previous + self.smoothing * (value - previous)
+
+    def prompt_tokens(self, model: str, prompt: str, benchmark: str = None) -> int:
+        return int(len(prompt) / self._lookup(self.chars_per_token, model, benchmark, self.default_chars_per_token)) + 1
+
+    def completion_tokens_for(self, model: str, benchmark: str = None) -> int:
+        return int(self._lookup(self.completion_tokens, model, benchmark, 0))
+
+    def request_tokens(self, model: str, prompt: str, benchmark: str = None) -> int:
+        # Provider limits count prompt and completion tokens alike
+        return self.prompt_tokens(model, prompt, benchmark) + self.completion_tokens_for(model, benchmark)
+
+    def observe(self, model: str, benchmark: str, prompt: str, usage):
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        if prompt_tokens:
+            self._update(self.chars_per_token, model, benchmark, max(len(prompt), 1) / prompt_tokens)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if completion_tokens is not None:
+            self._update(self.completion_tokens, model, benchmark, completion_tokens)
+
+class AdaptiveBudget:
+    """Concurrency, tokens-per-minute and requests-per-minute budget for one model or provider.
+
+    The concurrency limit is halved on every 429 and grows back by one slot
+    after a full window of successful requests (AIMD). A Retry-After header
+    pauses the whole budget until it expires. Requests are charged an
+    estimated token count up front and the difference to the reported usage
+    is settled when they are released.
+    """
+
+    def __init__(self, max_concurrency: int, tokens_per_minute: int = None, requests_per_minute: int = None):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.tokens = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.requests = requests_per_minute
+        self.in_flight = 0
+        self.successes = 0
+        self.paused_until = 0.0
+        self.refilled_at = time.monotonic()
+        self.condition = asyncio.Condition()
+
+    def _refill(self, now: float):
+        elapsed = now - self.refilled_at
+        if self.tokens_per_minute is not None:
+            self.tokens = min(self.tokens_per_minute, self.tokens + elapsed * self.tokens_per_minute / 60)
+        if self.requests_per_minute is not None:
+            self.requests = min(self.requests_per_minute, self.requests + elapsed * self.requests_per_minute / 60)
+        self.refilled_at = now
+
+    def _wait_time(self, tokens: int) -> Optional[float]:
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= self.limit:
+            return None  # Wait until a slot is released
+        wait_time = 0
+        if self.tokens_per_minute is not None:
+            # A single oversized request only has to wait for a full bucket
+            needed = min(tokens, self.tokens_per_minute)
+            if self.tokens < needed:
+                wait_time = (needed - self.tokens) * 60 / self.tokens_per_minute
+        if self.requests_per_minute is not None and self.requests < 1:
+            wait_time = max(wait_time, (1 - self.requests) * 60 / self.requests_per_minute)
+        return wait_time
+
+    async def acquire(self, tokens: int = 0):
+        async with self.condition:
+            while True:
+                wait_time = self._wait_time(tokens)
+                if wait_time == 0:
+                    break
+                try:
+                    await asyncio.wait_for(self.condition.wait(), wait_time)
+                except asyncio.TimeoutError:
+                    pass
+            self.in_flight += 1
+            if self.tokens_per_minute is not None:
+                self.tokens -= tokens
+            if self.requests_per_minute is not None:
+                self.requests -= 1
+
+    async def release(self, refund_tokens: int = 0):
+        # refund_tokens is the estimate minus the tokens actually used, negative when the estimate was too low
+        async with self.condition:
+            self.in_flight -= 1
+            if self.tokens_per_minute is not None:
+                self._refill(time.monotonic())
+                self.tokens = min(self.tokens_per_minute, self.tokens + refund_tokens)
+            self.condition.notify_all()
+
+    def record_success(self):
+        self.successes += 1
+        if self.successes >= self.limit:
+            self.successes = 0
+            self.limit = min(self.max_concurrency, self.limit + 1)
+
+    def record_rate_limit(self, retry_after: float = None):
+        self.successes = 0
+        self.limit = max(1, self.limit // 2)
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+class RequestCoalescer:
+    """Shares one in-flight request between concurrent identical queries.
+
+    Sits below the response cache: the first query for a key sends the
+    request, and queries for the same key that arrive before it is done await
+    its outcome instead of sending their own. Keys are dropped as soon as the
+    request finishes, later repeats are left to the cache.
+    """
+
+    def __init__(self):
+        self.in_flight = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, query: Callable[[], Awaitable]) -> Any:
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        # A follower whose leader was cancelled sends the request itself
+        while future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            future = self.in_flight.get(key)
+
+        self.requests += 1
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            result = await query()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Retrieved here, so a request nobody else waited for does not log a warning
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self.in_flight[key]
+
 class RateLimitedClient:
-    def __init__(self, client, rate_limit):
+    def __init__(self, client, cache: ResponseCache = None, budgets: Dict[str, Dict[str, Any]] = None, telemetry: Telemetry = None,
+                 stream: bool = False, failure_threshold: int = 8, breaker_reset_timeout: float = 120.0,
+                 coalescer: RequestCoalescer = None):
         self.client = client
-        self.limiter = AsyncLimiter(rate_limit, 1)  # rate_limit requests per second
+        # Stream completions and stop reading once the answer is complete
+        self.stream = stream
+        self.cache = cache or ResponseCache(mode="bypass")
+        self.telemetry = telemetry or Telemetry()
+        # Budget settings keyed by "model", "provider", a provider name or a model id
+        self.budget_settings = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self.model_budgets = {}
+        self.provider_budgets = {}
+        self.token_estimator = TokenEstimator()
+        self.failure_threshold = failure_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self.breakers = {}
+        # One per client, clients with other caches, transports or API keys must not share responses
+        self.coalescer = coalescer or RequestCoalescer()
 
-    async def query_model(self, model, prompt, max_retries=15):
-        for attempt in range(max_retries):
-            try:
-                async with self.limiter:
-                    completion = await self.client.chat.completions.create(
-                        model=model,
-                        messages=[
-                            {
-                                "role": "user",
-                                "content": prompt,
-                            },
-                        ],
-                    )
-                    return completion.choices[0].message.content
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    wait_time = 2 ** attempt  # Exponential backoff
-                    print(f"Attempt {attempt + 1} failed. Retrying in {wait_time} seconds...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    print(f"All {max_retries} attempts failed. Last error: {str(e)}")
-                    raise
\ No newline at end of file
+    def _make_budget(self, key: str, default_key: str) -> AdaptiveBudget:
+        settings = {**self.budget_settings[default_key], **self.budget_settings.get(key, {})}
+        return AdaptiveBudget(settings["max_concurrency"], settings.get("tokens_per_minute"), settings.get("requests_per_minute"))
+
+    def model_budget(self, model: str) -> AdaptiveBudget:
+        if model not in self.model_budgets:
+            self.model_budgets[model] = self._make_budget(model, "model")
+        return self.model_budgets[model]
+
+    def provider_budget(self, model: str) -> AdaptiveBudget:
+        provider = get_provider(model)
+        if provider not in self.provider_budgets:
+            self.provider_budgets[provider] = self._make_budget(provider, "provider")
+        return self.provider_budgets[provider]
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker(model, self.failure_threshold, self.breaker_reset_timeout)
+        return self.breakers[model]
+
+    async def _stream_until_answer(self, model, prompt, benchmark, request_start, close_tag, generation_params):
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            stream_options={"include_usage": True},
+            **generation_params,
+        )
+        parts = []
+        usage = None
+        time_to_answer = None
+        tail = ""
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                text = chunk.choices[0].delta.content
+                parts.append(text)
+                # The closing tag may be split across chunks, so keep the end of the previous one
+                window = (tail + text).lower()
+                if close_tag in window:
+                    time_to_answer = time.perf_counter() - request_start
+                    break
+                tail = window[-len(close_tag):]
+        finally:
+            # Closing the response early cancels the rest of the generation
+            await stream.close()
+
+        response = "".join(parts)
+        if usage is None:
+            # Usage is only sent at the end of the stream, estimate it when generation was cut off
+            usage = SimpleNamespace(prompt_tokens=self.token_estimator.prompt_tokens(model, prompt, benchmark),
+                                    completion_tokens=self.token_estimator.prompt_tokens(model, response, benchmark), estimated=True)
+        return response, usage, time_to_answer
+
+    async def query_model(self, model, prompt, max_retries=15, benchmark=None, answer_close_tag=ANSWER_CLOSE_TAG, **generation_params):
+        # answer_close_tag ends a streamed response early, batched prompts pass the tag of their last answer
+        # Responses cut off at the tag are cached under their own key, they must not answer a non-streamed query or another tag
+        cache_params = {**generation_params, "stream_until": answer_close_tag} if self.stream else generation_params
+        cached_response = self.cache.get(model, prompt, cache_params)
+        if cached_response is not None:
+            self.telemetry.observe_cache_hit(model, benchmark)
+            return cached_response
+
+        # Streamed responses are cut off at their closing tag, so the tag and the stream flag are part of the request
+        key = (model, prompt, self.stream, answer_close_tag if self.stream else None,
+               json.dumps(generation_params, sort_keys=True) if generation_params else None)
+        if key in self.coalescer.in_flight:
+            self.telemetry.observe_coalesced(model, benchmark)
+        return await self.coalescer.run(key, lambda: self._query_uncached(model, prompt, max_retries, benchmark, answer_close_tag,
+                                                                          generation_params, cache_params))
+
+    async def _query_uncached(self, model, prompt, max_retries, benchmark, answer_close_tag, generation_params, cache_params):
+        # Always acquire the model budget before the provider budget so lanes cannot deadlock
+        budgets = [self.model_budget(model), self.provider_budget(model)]
+        breaker = self.breaker(model)
+        limiter_wait = 0.0
+        probe = None
+        try:
+            for attempt in range(max_retries):
+                if not breaker.holds_probe(probe):
+                    try:
+                        probe = breaker.check()
+                    except ModelUnavailableError:
+                        self.telemetry.observe_rejected(model, benchmark)
+                        raise
+                # Re-estimated on every attempt, other requests may have calibrated the model in the meantime
+                tokens = self.token_estimator.request_tokens(model, prompt, benchmark)
+                refund_tokens = tokens  # Failed requests are assumed not to count against the provider's limit
+                wait_start = time.perf_counter()
+                for budget in budgets:
+                    await budget.acquire(tokens)
+                request_start = time.perf_counter()
+                limiter_wait += request_start - wait_start
+                try:
+                    if self.stream:
+                        response, usage, time_to_answer = await self._stream_until_answer(model, prompt, benchmark, request_start, answer_close_tag.lower(), generation_params)
+                    else:
+                        completion = await self.client.chat.completions.create(
+                            model=model,
+                            messages=[
+                                {
+                                    "role": "user",
+                                    "content": prompt,
+                                },
+                            ],
+                            **generation_params,
+                        )
+                        if not completion.choices:
+                            raise EmptyResponseError(f"Response for {model} has no choices")
+                        response = completion.choices[0].message.content
+                        usage = getattr(completion, "usage", None)
+                        time_to_answer = None
+                    self.telemetry.observe_request(model, benchmark, limiter_wait, time.perf_counter() - request_start, attempt, 200,
+                                                   usage, cost=getattr(usage, "cost", None), time_to_answer=time_to_answer)
+                    budgets[0].record_success()
+                    breaker.record_success()
+                    if usage is not None:
+                        refund_tokens = tokens - (getattr(usage, "prompt_tokens", 0) or 0) - (getattr(usage, "completion_tokens", 0) or 0)
+                        if not getattr(usage, "estimated", False):
+                            self.token_estimator.observe(model, benchmark, prompt, usage)
+                    self.cache.put(model, prompt, response, cache_params)
+                    return response
+                except Exception as e:
+                    status = get_status_code(e)
+                    if isinstance(e, RateLimitError):
+                        retry_after = get_retry_after(e)
+                        # A 429 cannot say whether the model or its provider was throttled, so every budget the request draws on backs off
+                        for budget in budgets:
+                            budget.record_rate_limit(retry_after)
+                        wait_time = retry_after + random.uniform(0, RETRY_BASE_DELAY) if retry_after is not None else backoff_delay(attempt)
+                    elif is_retryable(e):
+                        breaker.record_failure(e)
+                        wait_time = backoff_delay(attempt)
+                    else:
+                        if status in MODEL_ERROR_STATUSES:
+                            breaker.record_failure(e)
+                        if not isinstance(e, APIError):
+                            raise  # Not an API error, most likely a bug that should surface
+                        print(f"Request to {model} failed with status {status}, not retrying: {str(e)}")
+                        self.telemetry.observe_request(model, benchmark, limiter_wait, None, attempt, status)
+                        raise QueryError(model, str(e), status) from e
+                    if attempt < max_retries - 1:
+                        print(f"Attempt {attempt + 1} failed. Retrying in {wait_time:.1f} seconds...")
+                    else:
+                        print(f"All {max_retries} attempts failed. Last error: {str(e)}")
+                        self.telemetry.observe_request(model, benchmark, limiter_wait, None, attempt, status)
+                        raise QueryError(model, str(e), status) from e
+                finally:
+                    for budget in reversed(budgets):
+                        await budget.release(refund_tokens)
+                await asyncio.sleep(wait_time)
+        finally:
+            breaker.release_probe(probe)
@@ -1,83 +1,397 @@
 import os
-import importlib.util
+import time
+import socket
 import asyncio
 import json
-from typing import List, Dict, Any
-from benchmarks.base_benchmark import BaseBenchmark
-from api_handler import get_openrouter_client, RateLimitedClient
+import multiprocessing
+from typing import List, Dict, Any, Iterator, Tuple
+import pandas as pd
+from benchmarks.registry import BENCHMARK_REGISTRY, BenchmarkRegistry
+from api_handler import get_openrouter_client, fetch_openrouter_pricing, RateLimitedClient, QueryError
+from telemetry import Telemetry
+from response_cache import ResponseCache, ResponseCacheMiss, get_cache_dir
+from dataset_store import DatasetStore
+from http_transport import HttpTransport
+from scheduler import Barrier, Scheduler, WorkItem, batch_work_items, interleave
+from results_journal import ResultsJournal, SINGLE_MODE
+from work_queue import WorkQueue
+from prompt_table import PromptTable
+from sample_manifest import SampleManifest
+from normalized_dataset import load_normalized, table_slice
+from adaptive_sampling import AdaptiveSampler, wilson_interval
 from model import Model
 
+# Benchmarks that look up published scores instead of querying the model
+SCORE_ONLY_BENCHMARKS = ["ChatbotArena", "LiveBench"]
+# Questions per work unit of a sharded run
+SHARD_CHUNK_SIZE = 50
+# Errors that lose a question but not the run, a read-only cache misses the same way a dead model fails
+QUESTION_ERRORS = (QueryError, ResponseCacheMiss)
+
+
+def run_shard_worker(queue_path: str, options: Dict[str, Any], worker_id: str, benchmark_classes: Dict[str, type] = None):
+    # Entry point of the worker processes started by BenchmarkSuite.run_sharded
+    suite = BenchmarkSuite(**options)
+    suite.all_benchmarks.update(benchmark_classes or {})
+    asyncio.run(suite.run_worker(queue_path, worker_id))
+
 class BenchmarkSuite:
-    def __init__(self):
-        self.all_benchmarks = self._discover_benchmarks()
+    def __init__(self, cache_mode: str = "read-through", cache_path: str = None, cache_max_size_mb: float = None, cache_max_age_days: float = None, offline: bool = False, budgets: Dict[str, Dict[str, Any]] = None, journal_path: str = None, prompt_table_dir: str = None, metrics_path: str = None, sampler: AdaptiveSampler = None, manifest_dir: str = None, transport: HttpTransport = None, stream: bool = False, question_batch_size: int = 1, failure_threshold: int = 8):
+        self.all_benchmarks = BenchmarkRegistry()
         self.client = None
-        self.full_benchmark_data = {}
+        self.journal = ResultsJournal(journal_path)
+        self.cache_mode = cache_mode
+        self.cache_path = cache_path
+        self.cache_max_size_mb = cache_max_size_mb
+        self.cache_max_age_days = cache_max_age_days
+        self.budgets = budgets
+        self.transport = transport or HttpTransport()
+        self.stream = stream
+        # Questions per request for benchmarks that support batching, 1 asks every question on its own
+        self.question_batch_size = question_batch_size
+        self.question_modes = {}
+        self.failure_threshold = failure_threshold
+        # Questions that could not be answered per (model, benchmark), and the last error of each pair
+        self.failures = {}
+        self.failure_reasons = {}
+        self.dataset_store = DatasetStore(offline=offline, transport=self.transport)
+        self.dataset_sizes = {}
+        self.benchmark_tables = {}
         self.sampled_benchmark_data = {}
+        self.prompt_tables = {}
+        self.prompt_table_dir = prompt_table_dir
+        self.manifest_dir = manifest_dir or get_cache_dir("manifests")
+        self.metrics_path = metrics_path
+        self.telemetry = None
+        self.sampler = sampler
+        # Questions of each (model, benchmark) pair handed out but not yet recorded, and events set once a pair has none
+        self.pending_questions = {}
+        self.settled_events = {}
+        self.scheduler = None
+        self.sample_counts = {}
         self.samples_per_benchmark = None
 
-    def _discover_benchmarks(self):
-        discovered_benchmarks = {}
-        benchmark_dir = os.path.join(os.path.dirname(__file__), 'benchmarks')
-        
-        for filename in os.listdir(benchmark_dir):
-            if filename.endswith('.py') and filename != 'base_benchmark.py':
-                module_name = filename[:-3]  # Remove .py extension
-                module_path = os.path.join(benchmark_dir, filename)
-                
-                spec = importlib.util.spec_from_file_location(module_name, module_path)
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                
-                for item_name in dir(module):
-                    item = getattr(module, item_name)
-                    if isinstance(item, type) and issubclass(item, BaseBenchmark) and item != BaseBenchmark:
-                        discovered_benchmarks[item().id] = item
-        
-        return discovered_benchmarks
-
-    async def run(self, models: List[Model], benchmark_ids: List[str] = None, samples_per_benchmark: int = None) -> Dict[str, Dict[str, Any]]:
+    async def run(self, models: List[Model], benchmark_ids: List[str] = None, samples_per_benchmark: int = None, resume: bool = False) -> Dict[str, Dict[str, Any]]:
         self.samples_per_benchmark = samples_per_benchmark
+        benchmarks_to_run = self._select_benchmarks(benchmark_ids)
+        cache = await self._open_client()
+
+        # Load benchmark data once
+        await self._load_benchmark_data(benchmarks_to_run, samples_per_benchmark)
+
+        # Graded questions from an interrupted run are reused instead of being asked again
+        completed = self.journal.completed_keys(self.question_modes) if resume else set()
+        if completed:
+            print(f"Resuming from {self.journal.path}: {len(completed)} questions already graded")
+            if self.sampler is not None:
+                self.sampler.seed(self.journal.tally(self._sampled_row_ids(), self.question_modes)[1])
+
+        tasks = []
+        for model in models:
+            for benchmark_id, benchmark_class in benchmarks_to_run.items():
+                if benchmark_id in SCORE_ONLY_BENCHMARKS and (model.id, benchmark_id, None) not in completed:
+                    task = asyncio.create_task(self._run_benchmark(model, benchmark_id, benchmark_class))
+                    tasks.append(task)
+
+        lanes, total = self._build_lanes(models, benchmarks_to_run, completed)
+        if resume:
+            self._print_plan(models, benchmarks_to_run, completed, len(tasks), total)
+        scheduler = Scheduler(self.client)
+        self.scheduler = scheduler
+        self.journal.open(resume=resume)
+        try:
+            benchmark_results = await asyncio.gather(*tasks)
+            for model, benchmark_id, score in benchmark_results:
+                self.journal.append({"model": model.id, "benchmark": benchmark_id, "row_id": None, "score": float(score)})
+            await scheduler.run(lanes, self._process_work_item, total)
+        finally:
+            self.journal.close()
+            await self._close_client(cache)
+
+        return self._final_results(models, benchmarks_to_run)
+
+    def _select_benchmarks(self, benchmark_ids: List[str]) -> Dict[str, type]:
         benchmarks_to_run = {bid: self.all_benchmarks[bid] for bid in benchmark_ids if bid in self.all_benchmarks}
         if len(benchmarks_to_run) != len(benchmark_ids):
             missing = set(benchmark_ids) - set(benchmarks_to_run.keys())
             print(f"Warning: The following benchmarks were not found: {missing}")
+        # Batched answers are stored under their own mode and never counted towards single-question scores
+        self.question_modes = {
+            benchmark_id: f"batch{self.question_batch_size}"
+            for benchmark_id, benchmark_class in benchmarks_to_run.items()
+            if self.question_batch_size > 1 and benchmark_class.supports_batching
+        }
+        return benchmarks_to_run
 
-        openai_client = get_openrouter_client()
-        self.client = RateLimitedClient(openai_client, rate_limit=5)
+    async def _open_client(self) -> ResponseCache:
+        openai_client = get_openrouter_client(self.transport.api_client())
+        cache = ResponseCache(path=self.cache_path, mode=self.cache_mode, max_size_mb=self.cache_max_size_mb,
+                              max_age_days=self.cache_max_age_days)
+        self.telemetry = Telemetry(pricing=await fetch_openrouter_pricing(openai_client))
+        self.telemetry.track_pools(self.transport.pool_stats())
+        self.client = RateLimitedClient(openai_client, cache=cache, budgets=self.budgets, telemetry=self.telemetry, stream=self.stream,
+                                        failure_threshold=self.failure_threshold)
+        return cache
 
-        # Load benchmark data once
+    async def _close_client(self, cache: ResponseCache):
+        cache.close()
+        await self.transport.close()
+        self.telemetry.print_summary()
+        if self.metrics_path:
+            self.telemetry.write_prometheus(self.metrics_path)
+
+    def _final_results(self, models: List[Model], benchmarks_to_run) -> Dict[str, Dict[str, Any]]:
+        results = self.collect_results(models, list(benchmarks_to_run))
+        for model_id, model_data in results.items():
+            for benchmark_id, score in model_data["benchmarks"].items():
+                if score is None:
+                    failed = self.failures.get((model_id, benchmark_id), 0)
+                    reason = f", {failed} questions failed: {self.failure_reasons[(model_id, benchmark_id)]}" if failed else ""
+                    print(f"Final Score for {model_id} on {benchmark_id}: missing{reason}")
+                elif benchmark_id not in SCORE_ONLY_BENCHMARKS:
+                    print(f"Final Score for {model_id} on {benchmark_id}: {score:.2%}")
+        return results
+
+    async def run_sharded(self, models: List[Model], benchmark_ids: List[str] = None, samples_per_benchmark: int = None, resume: bool = False,
+                          workers: int = None, queue_path: str = None, chunk_size: int = SHARD_CHUNK_SIZE) -> Dict[str, Dict[str, Any]]:
+        """Like run(), but the questions are evaluated by worker processes pulling from a work queue.
+
+        The coordinator prepares the datasets, splits the missing questions into
+        (model, benchmark, chunk) units and starts `workers` local processes.
+        Workers on other hosts can join with run_worker() if the queue, the
+        cache directory and the results live on storage shared by all hosts.
+        Concurrency budgets apply per worker. Once the queue is drained the
+        shard journals are merged into this suite's journal. Adaptive sampling
+        is not supported, its stopping rule needs all answers of a pair in one
+        process.
+        """
+        if self.sampler is not None:
+            raise ValueError("Adaptive sampling cannot be combined with a sharded run")
+        self.samples_per_benchmark = samples_per_benchmark
+        benchmarks_to_run = self._select_benchmarks(benchmark_ids)
+        queue = WorkQueue(queue_path or os.path.join(os.path.dirname(os.path.abspath(self.journal.path)), "queue.sqlite"))
+        cache = await self._open_client()
         await self._load_benchmark_data(benchmarks_to_run, samples_per_benchmark)
 
-        results = {model.id: {"releaseDate": model.release_date, "benchmarks": {}} for model in models}
-        tasks = []
+        if resume:
+            # Results of workers from an interrupted sharded run count as completed
+            self._merge_shards(queue)
+        completed = self.journal.completed_keys(self.question_modes) if resume else set()
+        units = self._plan_units(models, benchmarks_to_run, completed, chunk_size)
+        queue.create({
+            "models": [{"id": model.id, "releaseDate": model.release_date} for model in models],
+            "benchmarks": [benchmark_id for benchmark_id in benchmarks_to_run if benchmark_id not in SCORE_ONLY_BENCHMARKS],
+            "samples": samples_per_benchmark,
+        }, units)
+        print(f"Queued {len(units)} work units in {queue.path} for {workers or 0} local workers")
 
-        for model in models:
-            for benchmark_id, benchmark_class in benchmarks_to_run.items():
-                task = asyncio.create_task(self._run_benchmark(model, benchmark_id, benchmark_class))
-                tasks.append(task)
+        # Workers are spawned rather than forked so they do not inherit the coordinator's event loop and sockets
+        context = multiprocessing.get_context("spawn")
+        # Classes registered on this suite directly are not in the registry manifest, hand them to the workers
+        benchmark_classes = {benchmark_id: self.all_benchmarks[benchmark_id] for benchmark_id in benchmarks_to_run
+                             if benchmark_id not in BENCHMARK_REGISTRY}
+        processes = [
+            context.Process(target=run_shard_worker, args=(queue.path, self._worker_options(), f"{socket.gethostname()}-{i}", benchmark_classes))
+            for i in range(workers or 0)
+        ]
+        for process in processes:
+            process.start()
 
-        benchmark_results = await asyncio.gather(*tasks)
+        self.journal.open(resume=resume)
+        try:
+            # Score-only benchmarks only read published scores, the coordinator handles them itself
+            tasks = [
+                self._run_benchmark(model, benchmark_id, benchmark_class)
+                for model in models
+                for benchmark_id, benchmark_class in benchmarks_to_run.items()
+                if benchmark_id in SCORE_ONLY_BENCHMARKS and (model.id, benchmark_id, None) not in completed
+            ]
+            for model, benchmark_id, score in await asyncio.gather(*tasks):
+                self.journal.append({"model": model.id, "benchmark": benchmark_id, "row_id": None, "score": float(score)})
+            for process in processes:
+                await asyncio.to_thread(process.join)
+            while not queue.finished() and not processes:
+                await asyncio.sleep(5)  # Only remote workers, wait for them to drain the queue
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            self.journal.close()
+            await self._close_client(cache)
 
-        for model, benchmark_id, score in benchmark_results:
-            results[model.id]["benchmarks"][benchmark_id] = score
+        if not queue.finished():
+            counts = queue.counts()
+            raise RuntimeError(f"Sharded run stopped with unfinished work units {counts}, see the worker output and rerun with resume")
+        self._merge_shards(queue)
+        queue.close()
+        return self._final_results(models, benchmarks_to_run)
 
-        return results
+    async def run_worker(self, queue_path: str, worker_id: str = None):
+        """Claim units from a sharded run's work queue and evaluate them until the queue is drained."""
+        if self.sampler is not None:
+            raise ValueError("Adaptive sampling cannot be combined with a sharded run")
+        worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        queue = WorkQueue(queue_path)
+        plan = queue.plan()
+        models = [Model(model["id"], model["releaseDate"]) for model in plan["models"]]
+        benchmarks_to_run = self._select_benchmarks(plan["benchmarks"])
+        self.samples_per_benchmark = plan["samples"]
+        self.journal = ResultsJournal(queue.shard_journal_path(worker_id))
+        if self.metrics_path:
+            root, extension = os.path.splitext(self.metrics_path)
+            self.metrics_path = f"{root}-{worker_id}{extension}"
+        cache = await self._open_client()
+        await self._load_benchmark_data(benchmarks_to_run, plan["samples"])
+
+        remaining = {}
+
+        async def handle(item: WorkItem, progress_bar):
+            await self._process_work_item(item, progress_bar)
+            remaining[item.unit_id] -= 1
+            if not remaining[item.unit_id]:
+                queue.complete(item.unit_id)
+
+        self.journal.open(resume=True)
+        try:
+            while not queue.finished():
+                lanes = {model.id: self._iter_unit_items(queue, worker_id, model, benchmarks_to_run, remaining) for model in models}
+                claimed = len(remaining)
+                await Scheduler(self.client).run(lanes, handle)
+                if len(remaining) == claimed:
+                    # Everything left is claimed by other workers, wait in case one of their leases expires
+                    await asyncio.sleep(5)
+        except BaseException:
+            queue.release(worker_id)
+            raise
+        finally:
+            self.journal.close()
+            await self._close_client(cache)
+            queue.close()
+
+    def _iter_unit_items(self, queue: WorkQueue, worker_id: str, model: Model, benchmarks_to_run, remaining: Dict[int, int]) -> Iterator[WorkItem]:
+        # Units are claimed lazily, one at a time per lane, so idle workers leave the rest of the queue to others
+        while True:
+            unit = queue.claim(worker_id, model.id)
+            if unit is None:
+                return
+            benchmark = benchmarks_to_run[unit.benchmark]()
+            benchmark.df = self.sampled_benchmark_data[unit.benchmark]
+            row_ids = set(unit.row_ids)
+            items = [
+                WorkItem(model, unit.benchmark, benchmark, row_id, prompt, correct_answer, unit_id=unit.id)
+                for row_id, prompt, correct_answer, _ in self.prompt_tables[unit.benchmark].slice(unit.start, unit.stop)
+                if row_id in row_ids
+            ]
+            if len(items) < len(row_ids):
+                print(f"Warning: {len(row_ids) - len(items)} questions of work unit {unit.id} are not in this worker's {unit.benchmark} sample")
+            items = list(self._batched(unit.benchmark, items))
+            remaining[unit.id] = len(items)
+            if not items:
+                queue.complete(unit.id)
+            yield from items
+
+    def _plan_units(self, models: List[Model], benchmarks_to_run, completed: set, chunk_size: int) -> List[tuple]:
+        units = []
+        for model in models:
+            chunks = []
+            for benchmark_id in benchmarks_to_run:
+                if benchmark_id in SCORE_ONLY_BENCHMARKS:
+                    continue
+                row_ids = self.prompt_tables[benchmark_id].row_ids
+                benchmark_chunks = []
+                for start in range(0, len(row_ids), chunk_size):
+                    stop = min(start + chunk_size, len(row_ids))
+                    missing = [row_id for row_id in row_ids[start:stop] if (model.id, benchmark_id, row_id) not in completed]
+                    if missing:
+                        benchmark_chunks.append((model.id, benchmark_id, start, stop, missing))
+                chunks.append(iter(benchmark_chunks))
+            units.extend(interleave(chunks))
+        return units
+
+    def _merge_shards(self, queue: WorkQueue):
+        added = self.journal.merge(ResultsJournal(path) for path in queue.shard_journal_paths())
+        if added:
+            print(f"Merged {added} results from {queue.shard_dir}")
+        queue.clear_shards()
+
+    def _worker_options(self) -> Dict[str, Any]:
+        return {
+            "cache_mode": self.cache_mode,
+            "cache_path": self.cache_path,
+            "cache_max_size_mb": self.cache_max_size_mb,
+            "cache_max_age_days": self.cache_max_age_days,
+            "offline": self.dataset_store.offline,
+            "budgets": self.budgets,
+            "prompt_table_dir": self.prompt_table_dir,
+            "metrics_path": self.metrics_path,
+            "manifest_dir": self.manifest_dir,
+            "transport": self.transport.clone(),
+            "stream": self.stream,
+            "question_batch_size": self.question_batch_size,
+            "failure_threshold": self.failure_threshold,
+        }
 
     async def _load_benchmark_data(self, benchmarks_to_run, samples_per_benchmark):
-        for benchmark_id, benchmark_class in benchmarks_to_run.items():
-            if benchmark_id not in self.full_benchmark_data:
-                benchmark = benchmark_class()
-                await benchmark.setup()
-                df = await benchmark.get_dataset()
-                self.full_benchmark_data[benchmark_id] = df
-                
-                if benchmark_id not in ["ChatbotArena", "LiveBench"] and samples_per_benchmark is not None and samples_per_benchmark < len(df):
-                    sampled_df = df.sample(n=samples_per_benchmark, random_state=1337)
-                else:
-                    sampled_df = df
-                
-                self.sampled_benchmark_data[benchmark_id] = sampled_df
-                await benchmark.cleanup()
+        # Benchmarks are prepared concurrently, so a cold start takes as long as the slowest dataset
+        start_time = time.perf_counter()
+        timings = await asyncio.gather(*(
+            self._prepare_benchmark(benchmark_id, benchmark_class, samples_per_benchmark)
+            for benchmark_id, benchmark_class in benchmarks_to_run.items()
+            if benchmark_id not in self.sampled_benchmark_data
+        ))
+        if timings:
+            self._print_preparation_timings(timings, time.perf_counter() - start_time)
+
+    async def _prepare_benchmark(self, benchmark_id: str, benchmark_class, samples_per_benchmark) -> Tuple[str, Dict[str, float]]:
+        timings = {}
+        stage_start = time.perf_counter()
+        benchmark = benchmark_class()
+        benchmark.store = self.dataset_store
+        await benchmark.setup()
+        timings["setup"] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        if benchmark_id in SCORE_ONLY_BENCHMARKS:
+            df = await benchmark.get_dataset()
+            self.dataset_sizes[benchmark_id] = len(df)
+            self.sampled_benchmark_data[benchmark_id] = df
+            timings["load"] = time.perf_counter() - stage_start
+            await benchmark.cleanup()
+            return benchmark_id, timings
+
+        # The full dataset stays a memory-mapped Arrow table, only the sampled rows become a DataFrame
+        table = await load_normalized(benchmark)
+        self.benchmark_tables[benchmark_id] = table
+        self.dataset_sizes[benchmark_id] = table.num_rows
+        timings["load"] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        row_keys = pd.Index(table.column("row_key").to_pylist(), name="row_key")
+        if samples_per_benchmark is not None and samples_per_benchmark < table.num_rows:
+            # The drawn row keys are persisted, so later runs reuse exactly the same questions
+            strata = pd.DataFrame({benchmark.stratify_by or "stratum": table.column("stratum").to_pylist()}, index=row_keys)
+            manifest = await asyncio.to_thread(SampleManifest.load_or_draw, benchmark, strata, samples_per_benchmark, self.manifest_dir)
+            positions = manifest.positions(row_keys)
+        else:
+            positions = list(range(table.num_rows))
+        sampled_df = await asyncio.to_thread(table_slice, table, positions)
+        timings["sample"] = time.perf_counter() - stage_start
+        
+        stage_start = time.perf_counter()
+        self.sampled_benchmark_data[benchmark_id] = sampled_df
+        # Prompts and gold answers are built once here and shared by every model
+        self.prompt_tables[benchmark_id] = await asyncio.to_thread(PromptTable.load_or_build, benchmark, sampled_df, self.prompt_table_dir)
+        timings["prompts"] = time.perf_counter() - stage_start
+        await benchmark.cleanup()
+        return benchmark_id, timings
+
+    @staticmethod
+    def _print_preparation_timings(timings: List[Tuple[str, Dict[str, float]]], wall_time: float):
+        total = sum(sum(stages.values()) for _, stages in timings)
+        print(f"Prepared {len(timings)} datasets in {wall_time:.2f}s ({total:.2f}s if run one after another)")
+        for benchmark_id, stages in sorted(timings, key=lambda timing: -sum(timing[1].values())):
+            stage_text = "  ".join(f"{stage} {seconds:>6.2f}s" for stage, seconds in stages.items())
+            print(f"  {benchmark_id:<14} {stage_text}  total {sum(stages.values()):>6.2f}s")
 
     async def _run_benchmark(self, model: Model, benchmark_id: str, benchmark_class):
         benchmark = benchmark_class()
@@ -88,13 +402,140 @@ class BenchmarkSuite:
         finally:
             pass
 
+    def _print_plan(self, models: List[Model], benchmarks_to_run, completed: set, score_only_cells: int, questions: int):
+        # Only the missing cells of the (model, benchmark, sample) matrix are scheduled
+        cells = len(models) * len(benchmarks_to_run)
+        missing_cells = score_only_cells
+        for model in models:
+            for benchmark_id in benchmarks_to_run:
+                if benchmark_id not in SCORE_ONLY_BENCHMARKS and any(
+                        (model.id, benchmark_id, row_id) not in completed for row_id in self.prompt_tables[benchmark_id].row_ids):
+                    missing_cells += 1
+        print(f"{cells - missing_cells} of {cells} (model, benchmark) cells already complete, "
+              f"scheduling {questions} questions for {missing_cells} cells")
+
+    def _build_lanes(self, models: List[Model], benchmarks_to_run, completed: set) -> Tuple[Dict[str, Iterator[WorkItem]], int]:
+        # Lanes are lazy, work items are only created when a worker is free to take them
+        lanes = {}
+        total = 0
+        for model in models:
+            iterators = []
+            for benchmark_id, benchmark_class in benchmarks_to_run.items():
+                if benchmark_id in SCORE_ONLY_BENCHMARKS:
+                    continue
+                iterators.append(self._batched(benchmark_id, self._iter_work_items(model, benchmark_id, benchmark_class, completed)))
+                total += sum(1 for row_id in self.prompt_tables[benchmark_id].row_ids if (model.id, benchmark_id, row_id) not in completed)
+            lanes[model.id] = interleave(iterators)
+        return lanes, total
+
+    def _iter_work_items(self, model: Model, benchmark_id: str, benchmark_class, completed: set) -> Iterator[WorkItem]:
+        benchmark = benchmark_class()
+        benchmark.df = self.sampled_benchmark_data[benchmark_id]
+        pair = (model.id, benchmark_id)
+        for position, (row_id, prompt, correct_answer, _) in enumerate(self.prompt_tables[benchmark_id]):
+            # In adaptive mode the sample is a cap, the pair is checked for a settled score before every batch
+            if self.sampler is not None and position % self.sampler.batch_size == 0:
+                # Only decide once the previous batch is recorded, answers still in flight would be missing from the interval
+                while self.pending_questions.get(pair):
+                    yield Barrier(self.settled_events.setdefault(pair, asyncio.Event()))
+                if self.sampler.should_stop(model.id, benchmark_id):
+                    self.scheduler.skip(sum(1 for later_row_id in self.prompt_tables[benchmark_id].row_ids[position:]
+                                            if (model.id, benchmark_id, later_row_id) not in completed))
+                    return
+            if (model.id, benchmark_id, row_id) not in completed:
+                if self.sampler is not None:
+                    self.pending_questions[pair] = self.pending_questions.get(pair, 0) + 1
+                yield WorkItem(model, benchmark_id, benchmark, row_id, prompt, correct_answer)
+
+    def _batched(self, benchmark_id: str, items: Iterator[WorkItem]) -> Iterator[WorkItem]:
+        if benchmark_id not in self.question_modes:
+            return items
+        return batch_work_items(items, self.question_batch_size)
+
+    async def _process_work_item(self, item: WorkItem, progress_bar):
+        try:
+            await self._answer_work_item(item, progress_bar)
+        finally:
+            if self.sampler is not None:
+                self._settle(item)
+
+    def _settle(self, item: WorkItem):
+        pair = (item.model.id, item.benchmark_id)
+        self.pending_questions[pair] -= 1 if item.batch is None else len(item.batch)
+        if not self.pending_questions[pair] and pair in self.settled_events:
+            self.settled_events.pop(pair).set()
+
+    async def _answer_work_item(self, item: WorkItem, progress_bar):
+        questions = [item] if item.batch is None else item.batch
+        try:
+            if item.batch is None:
+                records = [await item.benchmark.answer_prompt(item.model.id, self.client, item.prompt, item.correct_answer)]
+            else:
+                records = await item.benchmark.answer_batch(item.model.id, self.client, [question.prompt for question in questions],
+                                                            [question.correct_answer for question in questions])
+        except QUESTION_ERRORS as e:
+            self._record_failure(item, len(questions), e)
+            progress_bar.update(len(questions))
+            return
+        mode = self.question_modes.get(item.benchmark_id, SINGLE_MODE)
+        for question, record in zip(questions, records):
+            if isinstance(record, QUESTION_ERRORS):
+                self._record_failure(item, 1, record)
+                continue
+            if isinstance(record, BaseException):
+                raise record
+            record = {"model": item.model.id, "benchmark": item.benchmark_id, "row_id": question.row_id, **record}
+            if mode != SINGLE_MODE:
+                record["mode"] = mode
+            self.journal.append(record)
+            if self.sampler is not None:
+                self.sampler.record(item.model.id, item.benchmark_id, record["correct"])
+        progress_bar.update(len(questions))
+
+    def _record_failure(self, item: WorkItem, questions: int, error: Exception):
+        # Failed questions are left out of the journal, so the cell is reported as missing and a resumed run asks them again
+        key = (item.model.id, item.benchmark_id)
+        self.failures[key] = self.failures.get(key, 0) + questions
+        self.failure_reasons[key] = str(error)
+
+    def _sampled_row_ids(self) -> Dict[str, set]:
+        return {
+            benchmark_id: {str(index) for index in df.index}
+            for benchmark_id, df in self.sampled_benchmark_data.items()
+            if benchmark_id not in SCORE_ONLY_BENCHMARKS
+        }
+
+    def collect_results(self, models: List[Model], benchmark_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        # Scores are derived from the results journal, so they can be rebuilt without any API calls
+        scores, self.sample_counts = self.journal.tally(self._sampled_row_ids(), self.question_modes)
+
+        results = {}
+        for model in models:
+            results[model.id] = {"releaseDate": model.release_date, "benchmarks": {}}
+            for benchmark_id in benchmark_ids:
+                if self._is_missing(model.id, benchmark_id):
+                    results[model.id]["benchmarks"][benchmark_id] = None
+                elif (model.id, benchmark_id) in scores:
+                    results[model.id]["benchmarks"][benchmark_id] = scores[(model.id, benchmark_id)]
+        return results
+
+    def _is_missing(self, model_id: str, benchmark_id: str) -> bool:
+        # A score over part of the sample is not comparable to the other models, so incomplete cells have no score
+        if benchmark_id in SCORE_ONLY_BENCHMARKS or benchmark_id not in self.sampled_benchmark_data:
+            return False
+        answered = self.sample_counts.get((model_id, benchmark_id), (0, 0))[1]
+        if (model_id, benchmark_id) in self.failures or not answered:
+            return True
+        # Adaptive runs stop early on purpose, sharded runs only know about failures from the missing answers
+        return self.sampler is None and answered < len(self.sampled_benchmark_data[benchmark_id])
+
     def print_results(self, results: Dict[str, Dict[str, Any]]):
         for model_id, model_data in results.items():
             print(f"Results for model: {model_id} (Release Date: {model_data['releaseDate']})")
             for benchmark_id, score in model_data['benchmarks'].items():
-                print(f"  {benchmark_id}: {score:.2%}")
+                print(f"  {benchmark_id}: {'missing' if score is None else f'{score:.2%}'}")
 
-    def save_results_to_json(self, results: Dict[str, Dict[str, Any]], filename='data.json'):
+    def save_results_to_json(self, results: Dict[str, Dict[str, Any]], filename='data.json', merge: bool = False):
         formatted_results = []
         for model_id, model_data in results.items():
             model_result = {
@@ -105,14 +546,24 @@ class BenchmarkSuite:
             for benchmark_id, score in model_data['benchmarks'].items():
                 benchmark_info = {
                     "name": benchmark_id,
-                    "score": round(score * 100, 2)
+                    "score": round(score * 100, 2) if score is not None else None
                 }
+                if benchmark_id in self.question_modes:
+                    benchmark_info["mode"] = self.question_modes[benchmark_id]
                 
-                if benchmark_id not in ["ChatbotArena", "LiveBench"]:
-                    total_samples = len(self.full_benchmark_data[benchmark_id])
-                    drawn_samples = len(self.sampled_benchmark_data[benchmark_id])
+                if score is None:
+                    benchmark_info["missing"] = True
+                    benchmark_info["samplesDrawn"] = self.sample_counts.get((model_id, benchmark_id), (0, 0))[1]
+                    benchmark_info["totalSamples"] = self.dataset_sizes[benchmark_id]
+                elif benchmark_id not in SCORE_ONLY_BENCHMARKS:
+                    total_samples = self.dataset_sizes[benchmark_id]
+                    correct, drawn_samples = self.sample_counts.get((model_id, benchmark_id), (None, len(self.sampled_benchmark_data[benchmark_id])))
                     benchmark_info["samplesDrawn"] = drawn_samples
                     benchmark_info["totalSamples"] = total_samples
+                    if correct is not None:
+                        ci_low, ci_high = wilson_interval(correct, drawn_samples)
+                        benchmark_info["ciLow"] = round(ci_low * 100, 2)
+                        benchmark_info["ciHigh"] = round(ci_high * 100, 2)
                 else:
                     benchmark_info["samplesDrawn"] ="N/A"
                     benchmark_info["totalSamples"] ="N/A"
@@ -120,8 +571,37 @@ class BenchmarkSuite:
                 model_result["benchmarks"].append(benchmark_info)
             
             formatted_results.append(model_result)
+
+        if merge:
+            formatted_results = self.merge_results(formatted_results, filename)
         
         with open(filename, 'w') as f:
             json.dump(formatted_results, f, indent=2)
         
-        print(f"Results saved to {filename}")
\ No newline at end of file
+        print(f"Results saved to {filename}")
+
+    @staticmethod
+    def merge_results(formatted_results: List[Dict[str, Any]], filename: str) -> List[Dict[str, Any]]:
+        # Models and benchmarks that were not part of this run keep their previous entries
+        if not os.path.exists(filename):
+            return formatted_results
+        with open(filename, 'r') as f:
+            merged = json.load(f)
+
+        by_model = {model_result["model"]: model_result for model_result in merged}
+        for model_result in formatted_results:
+            previous = by_model.get(model_result["model"])
+            if previous is None:
+                merged.append(model_result)
+                continue
+            previous["releaseDate"] = model_result["releaseDate"]
+            # Scores of different prompting modes are separate entries
+            updated = {(benchmark_info["name"], benchmark_info.get("mode")): benchmark_info for benchmark_info in model_result["benchmarks"]}
+            benchmarks = []
+            for benchmark_info in previous["benchmarks"]:
+                new_info = updated.pop((benchmark_info["name"], benchmark_info.get("mode")), benchmark_info)
+                # A cell that is missing in this run keeps the score of an earlier complete run
+                benchmarks.append(benchmark_info if new_info.get("missing") else new_info)
+            previous["benchmarks"] = benchmarks
+            previous["benchmarks"].extend(updated.values())
+        return merged
\ No newline at end of file
@@ -1,21 +1,19 @@
 from benchmarks.base_benchmark import BaseBenchmark
 import pandas as pd
 import os
+import asyncio
+from typing import List
 
 class ARCChallengeBenchmark(BaseBenchmark):
+    supports_batching = True
+
     def __init__(self):
         super().__init__()
         self.id = "ARC-Challenge"
         self.data_url = "https://huggingface.co/datasets/allenai/ai2_arc/resolve/main/ARC-Challenge/validation-00000-of-00001.parquet"
 
-    async def setup(self):
-        await super().setup()
-        file_path = os.path.join(self.temp_dir, "arc_challenge_validation.parquet")
-        await self.download_file(self.data_url, file_path)
-        self.data = pd.read_parquet(file_path)
-
     async def get_dataset(self) -> pd.DataFrame:
-        return self.data
+        return await asyncio.to_thread(pd.read_parquet, os.path.join(self.data_dir, self.data_file))
 
     def get_question(self, row: pd.Series) -> str:
         question = row['question']
@@ -33,6 +31,18 @@ class ARCChallengeBenchmark(BaseBenchmark):
     def check_answer(self, model_answer: str, correct_answer: str) -> bool:
         return model_answer.strip().upper() == correct_answer.strip().upper()
 
+    def build_prompts(self, df: pd.DataFrame) -> List[str]:
+        options = df['choices'].map(lambda choices: "".join(f"{label}. {text}\n" for label, text in zip(choices['label'], choices['text'])))
+        questions = df['question'] + "\n\nOptions:\n" + options + "\nFinal answer should be the letter of the correct option."
+        return (questions + self.construct_prompt("")).tolist()
+
+    def get_correct_answers(self, df: pd.DataFrame) -> List[str]:
+        return df['answerKey'].tolist()
+
+    def check_answers(self, model_answers: List[str], correct_answers: List[str]) -> List[bool]:
+        model_answers = pd.Series(model_answers, dtype=object).str.strip().str.upper()
+        return (model_answers == pd.Series(correct_answers, dtype=object).str.strip().str.upper()).tolist()
+
     def construct_prompt(self, question: str) -> str:
         prompt = f"{question}\n\n"
         return self.append_answer_instruction(prompt)
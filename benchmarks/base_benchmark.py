@@ -1,24 +1,30 @@
 from abc import ABC, abstractmethod
 import os
-import tempfile
-import shutil
-import aiofiles
-import aiohttp
+import hashlib
 import pandas as pd
-from tqdm import tqdm
 import asyncio
-from typing import Any
+import time
+from typing import Any, List, Optional
 from urllib.parse import urlparse
+from dataset_store import DatasetStore
+from answer_extraction import extract_tagged_answer, extract_tagged_answers, extract_numbered_answers
 
 class BaseBenchmark(ABC):
+    # Short self-contained questions can be asked several at a time, see answer_batch
+    supports_batching = False
+
     def __init__(self):
         self.id = None
-        self.temp_dir = None
+        self.store = None
+        self.data_dir = None
         self.data_url = None
         self.data_file = None
+        self.stratify_by = None  # Column the sample manifest is stratified by
 
     async def setup(self):
-        self.create_temp_dir()
+        if self.store is None:
+            self.store = DatasetStore()
+        self.data_dir = self.store.path_for(self.id)
         await self.download_data()
 
     @abstractmethod
@@ -37,91 +43,141 @@ class BaseBenchmark(ABC):
     def check_answer(self, model_answer: str, correct_answer: Any) -> bool:
         pass
 
-    async def run(self, model: str, client, df: pd.DataFrame) -> float:
-        total_questions = len(df)
-        
-        print(f"Starting {self.id} benchmark for model: {model}")
-        print(f"Total questions: {total_questions}")
-        
-        progress_bar = tqdm(total=total_questions, desc="Progress", unit="question")
-        
-        tasks = []
-        for _, row in df.iterrows():
-            task = self.process_question(model, client, row, progress_bar)
-            tasks.append(task)
-
-        results = await asyncio.gather(*tasks)
-        
-        correct_answers = sum(results)
-        final_score = correct_answers / total_questions
-        
-        progress_bar.close()
-        print(f"\nFinal Score for {model} on {self.id}: {final_score:.2%}")
-        
-        return final_score
-
-    async def process_question(self, model: str, client, row, progress_bar):
-        question = self.get_question(row)
-        prompt = self.construct_prompt(question)
-        
-        model_response = await client.query_model(model, prompt)
+    # Batch API: prompts and gold answers are built once per benchmark and shared by
+    # every model, and a model's answers are graded in one pass. Subclasses override
+    # these with column-wise implementations, the defaults fall back to the per-row methods.
+
+    def build_prompts(self, df: pd.DataFrame) -> List[str]:
+        return [self.construct_prompt(self.get_question(row)) for row in df.to_dict("records")]
+
+    def get_correct_answers(self, df: pd.DataFrame) -> List[Any]:
+        return [self.get_correct_answer(row) for row in df.to_dict("records")]
+
+    def get_row_keys(self, df: pd.DataFrame) -> List[str]:
+        # Stable ids derived from the question text, independent of the row order upstream
+        row_keys = []
+        seen = {}
+        for row in df.to_dict("records"):
+            row_key = hashlib.sha256(self.get_question(row).encode("utf-8")).hexdigest()[:16]
+            seen[row_key] = seen.get(row_key, 0) + 1
+            row_keys.append(row_key if seen[row_key] == 1 else f"{row_key}-{seen[row_key]}")
+        return row_keys
+
+    def get_option_permutation(self, row: pd.Series) -> Optional[List[int]]:
+        # Benchmarks that shuffle their options return the order shown in the prompt
+        return None
+
+    def get_option_permutations(self, df: pd.DataFrame) -> List[Optional[List[int]]]:
+        return [self.get_option_permutation(row) for row in df.to_dict("records")]
+
+    def parse_model_answers(self, responses: List[str]) -> List[str]:
+        if type(self).parse_model_answer is not BaseBenchmark.parse_model_answer:
+            return [self.parse_model_answer(response) for response in responses]
+        return extract_tagged_answers(responses)
+
+    def check_answers(self, model_answers: List[str], correct_answers: List[Any]) -> List[bool]:
+        return [bool(self.check_answer(model_answer, correct_answer))
+                for model_answer, correct_answer in zip(model_answers, correct_answers)]
+
+    async def answer_prompt(self, model: str, client, prompt: str, correct_answer: Any) -> dict:
+        start_time = time.perf_counter()
+        model_response = await client.query_model(model, prompt, benchmark=self.id)
+        latency = time.perf_counter() - start_time
         model_answer = self.parse_model_answer(model_response)
         
-        correct_answer = self.get_correct_answer(row)
         is_correct = self.check_answer(model_answer, correct_answer)
         
-        progress_bar.update(1)
-        return int(is_correct)
+        return {
+            "response": model_response,
+            "answer": model_answer,
+            "correct_answer": correct_answer,
+            "correct": bool(is_correct),
+            "latency": round(latency, 3),
+        }
+
+    async def answer_batch(self, model: str, client, prompts: List[str], correct_answers: List[Any]) -> List[dict]:
+        """Ask several questions in one request, one record per question.
+
+        Each answer is read from its numbered [answer i] tag, the records keep
+        the whole response and the tag number as `answer_index`. Questions
+        whose answer is missing from the response are asked again on their own
+        and their records are marked as `fallback`. A fallback that fails is
+        returned as its exception in place of the record.
+        """
+        start_time = time.perf_counter()
+        model_response = await client.query_model(model, self.build_batch_prompt(prompts), benchmark=self.id,
+                                                  answer_close_tag=f"[/answer {len(prompts)}]")
+        latency = time.perf_counter() - start_time
+
+        found = extract_numbered_answers(model_response, len(prompts))
+        answered = [i for i, answer in enumerate(found) if answer is not None]
+        model_answers = self.parse_batched_answers([model_response] * len(answered), [i + 1 for i in answered])
+        checks = self.check_answers(model_answers, [correct_answers[i] for i in answered])
+        records = [None] * len(prompts)
+        for i, model_answer, is_correct in zip(answered, model_answers, checks):
+            records[i] = {
+                "response": model_response,
+                "answer_index": i + 1,
+                "answer": model_answer,
+                "correct_answer": correct_answers[i],
+                "correct": bool(is_correct),
+                "latency": round(latency, 3),
+            }
+
+        missing = [i for i, record in enumerate(records) if record is None]
+        # Answers already in the batched response are kept when a fallback fails
+        fallbacks = await asyncio.gather(*(self.answer_prompt(model, client, prompts[i], correct_answers[i]) for i in missing),
+                                         return_exceptions=True)
+        for i, record in zip(missing, fallbacks):
+            records[i] = record if isinstance(record, BaseException) else {**record, "fallback": True}
+        return records
+
+    def parse_batched_answers(self, responses: List[str], answer_indices: List[Optional[int]]) -> List[str]:
+        # Answers of batched prompts are cut out of their numbered tag and parsed like a single-question response
+        single_responses = []
+        for response, answer_index in zip(responses, answer_indices):
+            if answer_index is None:
+                single_responses.append(response)
+                continue
+            answer = extract_numbered_answers(response, answer_index)[answer_index - 1]
+            single_responses.append("" if answer is None else f"[answer]{answer}[/answer]")
+        return self.parse_model_answers(single_responses)
+
+    def build_batch_prompt(self, prompts: List[str]) -> str:
+        # The shared answer instruction is stated once instead of once per question
+        suffix = self.construct_prompt("")
+        questions = [prompt[:-len(suffix)] if suffix and prompt.endswith(suffix) else prompt for prompt in prompts]
+        numbered = "\n\n".join(f"Question {i}:\n{question.strip()}" for i, question in enumerate(questions, 1))
+        return (f"{numbered}\n\nPlease reason through each of the {len(prompts)} questions above. After your reasoning, "
+                f"provide the answer to every question in its own numbered tags, in order. "
+                f"For example: [answer 1]Answer to question 1[/answer 1] [answer 2]Answer to question 2[/answer 2]")
 
     def construct_prompt(self, question: str) -> str:
         prompt = f"{question}\n\n"
         return self.append_answer_instruction(prompt)
 
     def parse_model_answer(self, response: str) -> str:
-        start_tag = "[answer]"
-        end_tag = "[/answer]"
-        start_index = response.find(start_tag)
-        end_index = response.find(end_tag)
-        if start_index != -1 and end_index != -1:
-            return response[start_index + len(start_tag):end_index].strip()
-        else:
-            return response  # Return the full response if tags are not found
+        return extract_tagged_answer(response)
 
     @staticmethod
     def append_answer_instruction(prompt: str) -> str:
         return prompt + "Please reason through the question and options. After your reasoning, provide your answer enclosed in [answer] tags. For example: [answer]Your answer here[/answer]"
 
     async def cleanup(self):
-        self.remove_temp_dir()
-
-    def create_temp_dir(self):
-        self.temp_dir = tempfile.mkdtemp()
-
-    def remove_temp_dir(self):
-        if self.temp_dir and os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
+        # Downloaded data stays in the dataset store so later runs can revalidate it
+        pass
 
     async def download_data(self):
         if not self.data_url:
             return
         parsed_url = urlparse(self.data_url)
         self.data_file = os.path.basename(parsed_url.path)
-        local_path = os.path.join(self.temp_dir, self.data_file)
+        local_path = os.path.join(self.data_dir, self.data_file)
         await self.download_file(self.data_url, local_path)
 
-    @staticmethod
-    async def download_file(url: str, local_path: str):
+    async def download_file(self, url: str, local_path: str) -> str:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    response.raise_for_status()
-                    async with aiofiles.open(local_path, 'wb') as file:
-                        while True:
-                            chunk = await response.content.read(8192)
-                            if not chunk:
-                                break
-                            await file.write(chunk)
-            print(f"File downloaded successfully and saved to {local_path}")
+            return await self.store.fetch(url, local_path)
         except Exception as e:
             print(f"An error occurred while downloading the file: {e}")
             raise
\ No newline at end of file
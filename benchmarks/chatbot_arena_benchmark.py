@@ -1,10 +1,7 @@
 import pandas as pd
 import os
-import git
-import pickle
-import tempfile
-import shutil
 import asyncio
+import pickle
 from datetime import datetime
 from benchmarks.base_benchmark import BaseBenchmark
 
@@ -13,8 +10,7 @@ class ChatbotArenaBenchmark(BaseBenchmark):
         super().__init__()
         self.id = "ChatbotArena"
         self.repo_url = "https://huggingface.co/spaces/lmsys/chatbot-arena-leaderboard"
-        self.temp_dir = tempfile.mkdtemp()
-        self.repo_path = os.path.join(self.temp_dir, "chatbot-arena-leaderboard")
+        self.repo_path = None
         self.model_mapping = {
             "openai/gpt-3.5-turbo-0125": "gpt-3.5-turbo-0125",
             "openai/gpt-4o-mini-2024-07-18": "gpt-4o-mini-2024-07-18",
@@ -30,18 +26,19 @@ class ChatbotArenaBenchmark(BaseBenchmark):
         self.repo = None
 
     async def setup(self):
-        if not os.path.exists(self.repo_path):
-            self.repo = git.Repo.clone_from(self.repo_url, self.repo_path)
-        else:
-            self.repo = git.Repo(self.repo_path)
-            origin = self.repo.remotes.origin
-            origin.pull()
+        await super().setup()
+        self.repo_path = os.path.join(self.data_dir, "chatbot-arena-leaderboard")
+        # Only the Elo result pickles are needed, skip the rest of the space
+        self.repo = await asyncio.to_thread(self.store.sync_repo, self.repo_url, self.repo_path, sparse_patterns=["/elo_results_*.pkl"])
 
     def get_latest_elo_file(self):
         elo_files = [f for f in os.listdir(self.repo_path) if f.startswith("elo_results_") and f.endswith(".pkl")]
         return max(elo_files, key=lambda x: datetime.strptime(x.split("_")[2].split(".")[0], "%Y%m%d"))
 
     async def get_dataset(self):
+        return await asyncio.to_thread(self.read_dataset)
+
+    def read_dataset(self) -> pd.DataFrame:
         latest_file = self.get_latest_elo_file()
         with open(os.path.join(self.repo_path, latest_file), 'rb') as f:
             data = pickle.load(f)
@@ -77,9 +74,6 @@ class ChatbotArenaBenchmark(BaseBenchmark):
     async def cleanup(self):
         if self.repo:
             self.repo.close()
-        await asyncio.sleep(1)  # Give a moment for any pending operations to complete
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir, ignore_errors=True)
 
     # These methods are not used but are required by the BaseBenchmark abstract class
     def get_question(self, row: pd.Series) -> str:
@@ -1,6 +1,6 @@
-import csv
 import random
-from typing import List, Tuple
+import asyncio
+from typing import List
 from huggingface_hub import hf_hub_download
 from benchmarks.base_benchmark import BaseBenchmark
 import pandas as pd
@@ -14,40 +14,45 @@ class GPQADiamondBenchmark(BaseBenchmark):
 
     async def setup(self):
         await super().setup()
-        self.data_file = hf_hub_download(repo_id=self.repo_id, filename=self.filename, repo_type="dataset")
+        self.data_file = await asyncio.to_thread(hf_hub_download, repo_id=self.repo_id, filename=self.filename, repo_type="dataset",
+                                                 cache_dir=self.data_dir, local_files_only=self.store.offline)
 
     async def get_dataset(self) -> pd.DataFrame:
-        with open(self.data_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            return pd.DataFrame(list(reader))
+        return await asyncio.to_thread(self.read_dataset)
 
-    def get_question(self, row: pd.Series) -> Tuple[str, List[str]]:
-        question = row['Question']
-        correct_answer = row['Correct Answer']
-        incorrect_answers = [
+    def read_dataset(self) -> pd.DataFrame:
+        # Every field is kept as text, empty cells stay empty strings
+        return pd.read_csv(self.data_file, dtype=str, keep_default_na=False)
+
+    def get_options(self, row: pd.Series) -> List[str]:
+        return [
+            row['Correct Answer'],
             row['Incorrect Answer 1'],
             row['Incorrect Answer 2'],
             row['Incorrect Answer 3']
         ]
-        options = [correct_answer] + incorrect_answers
-        shuffled_options = list(enumerate(options))
-        random.shuffle(shuffled_options)
+
+    def get_option_permutation(self, row: pd.Series) -> List[int]:
+        # Seeded by the question text so every model and every run sees the same option order
+        permutation = list(range(4))
+        random.Random(row['Question']).shuffle(permutation)
+        return permutation
+
+    def get_question(self, row: pd.Series) -> str:
+        question = row['Question']
+        options = self.get_options(row)
         
         formatted_question = f"{question}\n\nOptions:\n"
-        for i, option in shuffled_options:
-            formatted_question += f"- {option}\n"
+        for i in self.get_option_permutation(row):
+            formatted_question += f"- {options[i]}\n"
         
-        return formatted_question, [option for _, option in shuffled_options]
+        return formatted_question
 
     def get_correct_answer(self, row: pd.Series) -> str:
         return row['Correct Answer']
 
     def check_answer(self, model_answer: str, correct_answer: str) -> bool:
         try:
-            return model_answer.strip().lower() == correct_answer
-        except (ValueError, IndexError):
+            return model_answer.strip().lower() == correct_answer.strip().lower()
+        except (ValueError, IndexError, AttributeError):
             return False
-
-    def process_question(self, model: str, client, row, progress_bar):
-        question, self.shuffled_options = self.get_question(row)
-        return super().process_question(model, client, row, progress_bar)
\ No newline at end of file
@@ -1,22 +1,20 @@
 from benchmarks.base_benchmark import BaseBenchmark
 import pandas as pd
 import os
+import asyncio
 import numpy as np 
+from typing import List
 
 class HellaSwagBenchmark(BaseBenchmark):
+    supports_batching = True
+
     def __init__(self):
         super().__init__()
         self.id = "HellaSwag"
         self.data_url = "https://huggingface.co/api/datasets/Rowan/hellaswag/parquet/default/validation/0.parquet"
 
-    async def setup(self):
-        await super().setup()
-        file_path = os.path.join(self.temp_dir, "hellaswag_validation.parquet")
-        await self.download_file(self.data_url, file_path)
-        self.data = pd.read_parquet(file_path)
-
     async def get_dataset(self) -> pd.DataFrame:
-        return self.data
+        return await asyncio.to_thread(pd.read_parquet, os.path.join(self.data_dir, self.data_file))
 
     def get_question(self, row: pd.Series) -> str:
         ctx = row['ctx']
@@ -37,6 +35,18 @@ class HellaSwagBenchmark(BaseBenchmark):
     def check_answer(self, model_answer: str, correct_answer: str) -> bool:
         return model_answer.strip() == correct_answer.strip()
 
+    def build_prompts(self, df: pd.DataFrame) -> List[str]:
+        options = df['endings'].map(lambda endings: "".join(f"{i}. {ending}\n" for i, ending in enumerate(endings)))
+        questions = df['ctx'] + "\n\nOptions:\n" + options + "\nFinal answer should be the number of the correct option."
+        return (questions + self.construct_prompt("")).tolist()
+
+    def get_correct_answers(self, df: pd.DataFrame) -> List[str]:
+        return df['label'].tolist()
+
+    def check_answers(self, model_answers: List[str], correct_answers: List[str]) -> List[bool]:
+        model_answers = pd.Series(model_answers, dtype=object).str.strip()
+        return (model_answers == pd.Series(correct_answers, dtype=object).str.strip()).tolist()
+
     def construct_prompt(self, question: str) -> str:
         prompt = f"{question}\n\n"
         return self.append_answer_instruction(prompt)
@@ -1,6 +1,6 @@
-import aiohttp
+import os
+import asyncio
 import pandas as pd
-from io import StringIO
 from benchmarks.base_benchmark import BaseBenchmark
 
 class LiveBenchCSVBenchmark(BaseBenchmark):
@@ -22,11 +22,9 @@ class LiveBenchCSVBenchmark(BaseBenchmark):
 
     async def setup(self):
         await super().setup()
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self.url) as response:
-                csv_content = await response.text()
+        file_path = await self.download_file(self.url, os.path.join(self.data_dir, os.path.basename(self.url)))
         
-        df = pd.read_csv(StringIO(csv_content))
+        df = await asyncio.to_thread(pd.read_csv, file_path)
         df['average_score'] = df.iloc[:, 1:].mean(axis=1)
         self.df = df[['model', 'average_score']]
 
@@ -1,34 +1,38 @@
 import os
+import asyncio
 import pandas as pd
-import git
-import tempfile
-import re
+from typing import List
 from benchmarks.base_benchmark import BaseBenchmark
+from answer_extraction import normalize_number
 
 class MGSMBenchmark(BaseBenchmark):
     def __init__(self):
         super().__init__()
         self.id = "MGSM"
+        self.stratify_by = "language"
         self.repo_url = "https://huggingface.co/datasets/juletxara/mgsm"
-        self.temp_dir = tempfile.mkdtemp()
-        self.repo_path = os.path.join(self.temp_dir, "mgsm")
+        self.repo_path = None
         self.repo = None
 
     async def setup(self):
         await super().setup()
-        if not os.path.exists(self.repo_path):
-            self.repo = git.Repo.clone_from(self.repo_url, self.repo_path)
-        else:
-            self.repo = git.Repo(self.repo_path)
-            origin = self.repo.remotes.origin
-            origin.pull()
+        self.repo_path = os.path.join(self.data_dir, "mgsm")
+        self.repo = await asyncio.to_thread(self.store.sync_repo, self.repo_url, self.repo_path, sparse_patterns=["/*.tsv"])
+
+    async def cleanup(self):
+        if self.repo:
+            self.repo.close()
 
     async def get_dataset(self) -> pd.DataFrame:
+        return await asyncio.to_thread(self.read_dataset)
+
+    def read_dataset(self) -> pd.DataFrame:
         all_questions = []
         for file in os.listdir(self.repo_path):
             if file.endswith('.tsv'):
                 file_path = os.path.join(self.repo_path, file)
                 df = pd.read_csv(file_path, sep='\t', names=['question', 'answer_number'], quoting=3)
+                df['language'] = file[:-len('.tsv')].split('_')[-1]  # mgsm_<language>.tsv
                 all_questions.append(df)
         
         return pd.concat(all_questions, ignore_index=True)
@@ -39,11 +43,16 @@ class MGSMBenchmark(BaseBenchmark):
     def get_correct_answer(self, row: pd.Series) -> str:
         return str(row['answer_number'])
 
+    def build_prompts(self, df: pd.DataFrame) -> List[str]:
+        return (df['question'] + self.construct_prompt("")).tolist()
+
+    def get_correct_answers(self, df: pd.DataFrame) -> List[str]:
+        return df['answer_number'].astype(str).tolist()
+
     def extract_number(self, text: str) -> float:
-        # Keep only digits and decimal points
-        cleaned_text = ''.join(char for char in text if char in '0123456789.')
-        if cleaned_text:
-            return float(cleaned_text)
+        value = normalize_number(text)
+        if value is not None:
+            return value
         else:
             raise ValueError("No numeric value found in the answer")
 
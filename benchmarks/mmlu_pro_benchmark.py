@@ -1,15 +1,20 @@
 from benchmarks.base_benchmark import BaseBenchmark
 import pandas as pd
 import os
+import asyncio
+from typing import List
 
 class MMULProBenchmark(BaseBenchmark):
+    supports_batching = True
+
     def __init__(self):
         super().__init__()
         self.id = "MMLU-Pro"
+        self.stratify_by = "category"
         self.data_url = "https://huggingface.co/datasets/TIGER-Lab/MMLU-Pro/resolve/main/data/test-00000-of-00001.parquet"
 
     async def get_dataset(self) -> pd.DataFrame:
-        return pd.read_parquet(os.path.join(self.temp_dir, self.data_file))
+        return await asyncio.to_thread(pd.read_parquet, os.path.join(self.data_dir, self.data_file))
 
     def get_question(self, row: pd.Series) -> str:
         question = row['question']
@@ -24,4 +29,16 @@ class MMULProBenchmark(BaseBenchmark):
         return row['answer']
 
     def check_answer(self, model_answer: str, correct_answer: str) -> bool:
-        return model_answer.strip().upper() == correct_answer
\ No newline at end of file
+        return model_answer.strip().upper() == correct_answer
+
+    def build_prompts(self, df: pd.DataFrame) -> List[str]:
+        options = df['options'].map(lambda options: "".join(f"{chr(65 + i)}. {option}\n" for i, option in enumerate(options)))
+        questions = df['question'] + "\n\nOptions:\n" + options + "Final answer should be the single letter you choose."
+        return (questions + self.construct_prompt("")).tolist()
+
+    def get_correct_answers(self, df: pd.DataFrame) -> List[str]:
+        return df['answer'].tolist()
+
+    def check_answers(self, model_answers: List[str], correct_answers: List[str]) -> List[bool]:
+        model_answers = pd.Series(model_answers, dtype=object).str.strip().str.upper()
+        return (model_answers == pd.Series(correct_answers, dtype=object)).tolist()
\ No newline at end of file
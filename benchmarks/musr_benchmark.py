@@ -2,6 +2,8 @@ from benchmarks.base_benchmark import BaseBenchmark
 import pandas as pd
 import os
 import ast
+import asyncio
+from typing import List
 
 class MuSRBenchmark(BaseBenchmark):
     def __init__(self):
@@ -10,7 +12,10 @@ class MuSRBenchmark(BaseBenchmark):
         self.data_url = "https://huggingface.co/datasets/TAUR-Lab/MuSR/resolve/main/all.csv"
 
     async def get_dataset(self) -> pd.DataFrame:
-        file_path = os.path.join(self.temp_dir, self.data_file)
+        return await asyncio.to_thread(self.read_dataset)
+
+    def read_dataset(self) -> pd.DataFrame:
+        file_path = os.path.join(self.data_dir, self.data_file)
         df = pd.read_csv(file_path)
         df['choices'] = df['choices'].apply(ast.literal_eval)
         return df
@@ -32,6 +37,18 @@ class MuSRBenchmark(BaseBenchmark):
     def check_answer(self, model_answer: str, correct_answer: str) -> bool:
         return model_answer.strip() == correct_answer
 
+    def build_prompts(self, df: pd.DataFrame) -> List[str]:
+        options = df['choices'].map(lambda choices: "".join(f"{i+1}. {choice}\n" for i, choice in enumerate(choices)))
+        questions = df['narrative'] + "\n\n" + df['question'] + "\n\nOptions:\n" + options + "\nFinal answer should be the number of the correct option."
+        return (questions + self.construct_prompt("")).tolist()
+
+    def get_correct_answers(self, df: pd.DataFrame) -> List[str]:
+        return (df['answer_index'] + 1).astype(str).tolist()
+
+    def check_answers(self, model_answers: List[str], correct_answers: List[str]) -> List[bool]:
+        model_answers = pd.Series(model_answers, dtype=object).str.strip()
+        return (model_answers == pd.Series(correct_answers, dtype=object)).tolist()
+
     def construct_prompt(self, question: str) -> str:
         prompt = f"{question}\n\n"
         return self.append_answer_instruction(prompt)
@@ -0,0 +1,65 @@
+import importlib
+from typing import Dict, Iterator
+from collections.abc import MutableMapping
+
+# Benchmark id -> "module:Class". Benchmark modules are only imported once a
+# benchmark is selected, so listing benchmarks or running one of them does not
+# pay for every benchmark's dependencies. New benchmarks must be added here.
+BENCHMARK_REGISTRY = {
+    "MMLU-Pro": "benchmarks.mmlu_pro_benchmark:MMULProBenchmark",
+    "GPQA-Diamond": "benchmarks.gpqa_diamond_benchmark:GPQADiamondBenchmark",
+    "ChatbotArena": "benchmarks.chatbot_arena_benchmark:ChatbotArenaBenchmark",
+    "MATH-Hard": "benchmarks.math_hard_benchmark:MathHardBenchmark",
+    "MuSR": "benchmarks.musr_benchmark:MuSRBenchmark",
+    "ARC-Challenge": "benchmarks.arc_challenge_benchmark:ARCChallengeBenchmark",
+    "HellaSwag": "benchmarks.hellaswag_benchmark:HellaSwagBenchmark",
+    "LiveBench": "benchmarks.livebench_benchmark:LiveBenchCSVBenchmark",
+    "MGSM": "benchmarks.mgsm_benchmark:MGSMBenchmark",
+}
+
+
+def import_target(target: str) -> type:
+    module_name, class_name = target.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def load_benchmark_class(benchmark_id: str) -> type:
+    return import_target(BENCHMARK_REGISTRY[benchmark_id])
+
+
+class BenchmarkRegistry(MutableMapping):
+    """Mapping of benchmark id to benchmark class that imports classes on first access.
+
+    Membership tests and iteration only read the manifest. Classes registered
+    directly, e.g. synthetic benchmarks in perf/, take precedence.
+    """
+
+    def __init__(self, manifest: Dict[str, str] = None):
+        self.manifest = dict(BENCHMARK_REGISTRY if manifest is None else manifest)
+        self.loaded = {}
+
+    def __getitem__(self, benchmark_id: str) -> type:
+        if benchmark_id not in self.loaded:
+            if benchmark_id not in self.manifest:
+                raise KeyError(benchmark_id)
+            self.loaded[benchmark_id] = import_target(self.manifest[benchmark_id])
+        return self.loaded[benchmark_id]
+
+    def __setitem__(self, benchmark_id: str, benchmark_class: type):
+        self.loaded[benchmark_id] = benchmark_class
+
+    def __delitem__(self, benchmark_id: str):
+        if benchmark_id not in self:
+            raise KeyError(benchmark_id)
+        self.manifest.pop(benchmark_id, None)
+        self.loaded.pop(benchmark_id, None)
+
+    def __contains__(self, benchmark_id) -> bool:
+        return benchmark_id in self.loaded or benchmark_id in self.manifest
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.manifest
+        yield from (benchmark_id for benchmark_id in self.loaded if benchmark_id not in self.manifest)
+
+    def __len__(self) -> int:
+        return len(self.manifest.keys() | self.loaded.keys())
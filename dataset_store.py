@@ -0,0 +1,110 @@
+import os
+import json
+import hashlib
+import aiofiles
+from response_cache import get_cache_dir
+from http_transport import HttpTransport
+
+
+class DatasetStore:
+    """Persistent dataset directory shared by all benchmarks and runs.
+
+    Files are revalidated with ETag/Last-Modified and verified against a stored
+    sha256, git sources are kept as shallow (optionally sparse) clones. In
+    offline mode nothing touches the network once the store is warm. Downloads
+    share the transport's pooled session.
+    """
+
+    def __init__(self, root: str = None, offline: bool = False, transport: HttpTransport = None):
+        self.root = root or get_cache_dir("datasets")
+        self.offline = offline
+        self.transport = transport or HttpTransport()
+
+    def path_for(self, benchmark_id: str) -> str:
+        path = os.path.join(self.root, benchmark_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def _meta_path(local_path: str) -> str:
+        return local_path + ".meta.json"
+
+    def _load_meta(self, local_path: str) -> dict:
+        meta_path = self._meta_path(local_path)
+        if not os.path.exists(local_path) or not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get("sha256") != self.file_checksum(local_path):
+            print(f"Checksum mismatch for {local_path}, fetching it again")
+            return None
+        return meta
+
+    @staticmethod
+    def file_checksum(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    async def fetch(self, url: str, local_path: str) -> str:
+        meta = self._load_meta(local_path)
+        if meta is not None and self.offline:
+            return local_path
+        if meta is None and self.offline:
+            raise FileNotFoundError(f"{url} is not in the dataset store and offline mode is enabled")
+
+        headers = {}
+        if meta is not None and meta.get("url") == url:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        partial_path = local_path + ".part"
+        digest = hashlib.sha256()
+        session = self.transport.download_session()
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304:
+                print(f"Dataset file is up to date: {local_path}")
+                return local_path
+            response.raise_for_status()
+            async with aiofiles.open(partial_path, 'wb') as file:
+                while True:
+                    chunk = await response.content.read(65536)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    await file.write(chunk)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        os.replace(partial_path, local_path)
+        with open(self._meta_path(local_path), 'w') as f:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified, "sha256": digest.hexdigest()}, f)
+        print(f"File downloaded successfully and saved to {local_path}")
+        return local_path
+
+    def sync_repo(self, url: str, local_path: str, sparse_patterns: list = None) -> "git.Repo":
+        import git  # GitPython is slow to import and only needed by git-backed benchmarks
+        if os.path.exists(os.path.join(local_path, ".git")):
+            repo = git.Repo(local_path)
+            if self.offline:
+                return repo
+            remote_head = repo.git.ls_remote(url, "HEAD").split()[0]
+            if remote_head != repo.head.commit.hexsha:
+                repo.remotes.origin.fetch(depth=1)
+                repo.git.reset("--hard", "FETCH_HEAD")
+            return repo
+
+        if self.offline:
+            raise FileNotFoundError(f"{url} is not in the dataset store and offline mode is enabled")
+
+        if sparse_patterns:
+            repo = git.Repo.clone_from(url, local_path, depth=1, filter="blob:none", no_checkout=True)
+            repo.git.sparse_checkout("set", "--no-cone", *sparse_patterns)
+            repo.git.checkout()
+        else:
+            repo = git.Repo.clone_from(url, local_path, depth=1)
+        return repo
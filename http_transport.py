@@ -0,0 +1,123 @@
+import importlib.util
+from typing import List
+import aiohttp
+import httpx
+from openai import DefaultAsyncHttpxClient
+
+# HTTP/2 multiplexes this many concurrent streams over one connection by default
+HTTP2_STREAMS_PER_CONNECTION = 100
+
+
+class PoolStats:
+    """Request, connection and saturation counters for one connection pool."""
+
+    def __init__(self, name: str, max_connections: int, streams_per_connection: int = 1):
+        self.name = name
+        self.max_connections = max_connections
+        self.capacity = max_connections * streams_per_connection
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.new_connections = 0
+        self.queued = 0
+
+    def request_started(self):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        if self.in_flight > self.capacity:
+            self.queued += 1  # No free connection, the request waits for the pool
+
+    def request_finished(self):
+        self.in_flight -= 1
+
+
+class CountingTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, stats: PoolStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.request_started()
+        request.extensions["trace"] = self.trace
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self.stats.request_finished()
+
+    async def trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            self.stats.new_connections += 1
+
+
+class HttpTransport:
+    """Shared, pooled HTTP clients for the OpenRouter API and dataset downloads.
+
+    The API client is an httpx client with keep-alive and HTTP/2 (when the h2
+    package is installed), sized for the suite's concurrency budgets. Dataset
+    downloads share one aiohttp session instead of opening a session per file.
+    Both pools count requests, new connections and requests that had to wait
+    for a free connection.
+    """
+
+    def __init__(self, max_connections: int = 256, max_keepalive_connections: int = 64, keepalive_expiry: float = 30.0,
+                 connect_timeout: float = 10.0, read_timeout: float = 600.0, http2: bool = True, download_connections: int = 16):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.download_connections = download_connections
+        self.api_stats = PoolStats("api", max_connections, HTTP2_STREAMS_PER_CONNECTION if self.http2 else 1)
+        self.download_stats = PoolStats("download", download_connections)
+        self._api_client = None
+        self._download_session = None
+
+    def clone(self) -> "HttpTransport":
+        # Same settings with fresh pools, e.g. for worker processes
+        return HttpTransport(self.max_connections, self.max_keepalive_connections, self.keepalive_expiry, self.connect_timeout,
+                             self.read_timeout, self.http2, self.download_connections)
+
+    def api_client(self) -> httpx.AsyncClient:
+        if self._api_client is None or self._api_client.is_closed:
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_keepalive_connections,
+                                  keepalive_expiry=self.keepalive_expiry)
+            self._api_client = DefaultAsyncHttpxClient(
+                transport=CountingTransport(self.api_stats, http2=self.http2, limits=limits),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            )
+        return self._api_client
+
+    def download_session(self) -> aiohttp.ClientSession:
+        # Created on first use so it binds to the running event loop
+        if self._download_session is None or self._download_session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_request_start.append(self._on_download_start)
+            trace_config.on_request_end.append(self._on_download_end)
+            trace_config.on_request_exception.append(self._on_download_end)
+            trace_config.on_connection_create_end.append(self._on_download_connection)
+            self._download_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.download_connections, keepalive_timeout=self.keepalive_expiry),
+                timeout=aiohttp.ClientTimeout(connect=self.connect_timeout, sock_read=self.read_timeout),
+                trace_configs=[trace_config],
+            )
+        return self._download_session
+
+    async def _on_download_start(self, session, context, params):
+        self.download_stats.request_started()
+
+    async def _on_download_end(self, session, context, params):
+        self.download_stats.request_finished()
+
+    async def _on_download_connection(self, session, context, params):
+        self.download_stats.new_connections += 1
+
+    def pool_stats(self) -> List[PoolStats]:
+        return [self.api_stats, self.download_stats]
+
+    async def close(self):
+        if self._api_client is not None:
+            await self._api_client.aclose()
+        if self._download_session is not None:
+            await self._download_session.close()
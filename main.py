@@ -1,9 +1,89 @@
-from benchmark_suite import BenchmarkSuite
+from benchmarks.registry import BENCHMARK_REGISTRY
 from model import Model
+from response_cache import CACHE_MODES
+from adaptive_sampling import AdaptiveSampler
+import argparse
 import asyncio
 
-async def main():
-    suite = BenchmarkSuite()
+# Specify which benchmarks to run
+DEFAULT_BENCHMARKS = [
+    "MMLU-Pro",
+    "GPQA-Diamond",
+    "ChatbotArena",
+    "MATH-Hard",
+    "MuSR",
+    "ARC-Challenge",
+    "HellaSwag",
+    "LiveBench",
+    "MGSM"
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the BenchmarkAggregator suite")
+    parser.add_argument("--list", action="store_true", help="List the available benchmarks and exit")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARK_REGISTRY), default=DEFAULT_BENCHMARKS, metavar="BENCHMARK",
+                        help="Benchmarks to run, only these are imported")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default="read-through",
+                        help="read-through reuses and stores responses, read-only replays stored responses only, bypass always queries the API")
+    parser.add_argument("--cache-path", default=None, help="Location of the response cache database")
+    parser.add_argument("--cache-max-size-mb", type=float, default=None,
+                        help="Evict the least recently used responses once the cache grows past this size")
+    parser.add_argument("--cache-max-age-days", type=float, default=None, help="Evict responses stored more than this many days ago")
+    parser.add_argument("--offline", action="store_true", help="Only use datasets already in the local dataset store")
+    parser.add_argument("--resume", action="store_true", help="Skip questions already graded in the results journal of a previous run")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only evaluate (model, benchmark) cells missing from the results journal and merge them into the existing data.json")
+    parser.add_argument("--journal-path", default=None, help="Location of the per-question results journal")
+    parser.add_argument("--prompt-table-dir", default=None, help="Persist prompt tables here and memory-map them on later runs")
+    parser.add_argument("--manifest-dir", default=None, help="Directory of per-benchmark sample manifests, point it at a versioned directory to pin the samples")
+    parser.add_argument("--metrics-path", default=None, help="Write per-request metrics in Prometheus text format to this file")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Draw questions in batches and stop a model on a benchmark once its score is settled, samples_per_benchmark becomes the cap")
+    parser.add_argument("--ci-width", type=float, default=0.1, help="Adaptive mode stops once the 95%% Wilson interval is narrower than this")
+    parser.add_argument("--sample-batch-size", type=int, default=20, help="Questions drawn per batch in adaptive mode")
+    parser.add_argument("--min-samples", type=int, default=20, help="Questions drawn before adaptive mode may stop")
+    parser.add_argument("--batch-questions", type=int, default=1, metavar="K",
+                        help="Ask K questions per request on benchmarks that support it, scores are stored separately from single-question runs")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Evaluate questions in this many worker processes that pull from a shared work queue")
+    parser.add_argument("--queue-path", default=None, help="Work queue of a sharded run, put it on shared storage to add workers on other hosts")
+    parser.add_argument("--join-queue", default=None, metavar="QUEUE_PATH",
+                        help="Only run a worker for the sharded run queued at this path, then exit")
+    parser.add_argument("--chunk-size", type=int, default=50, help="Questions per work unit of a sharded run")
+    parser.add_argument("--tokens-per-minute", type=int, default=None, help="Per-model budget of prompt and completion tokens per minute")
+    parser.add_argument("--requests-per-minute", type=int, default=None, help="Per-model budget of requests per minute")
+    parser.add_argument("--failure-threshold", type=int, default=8,
+                        help="Consecutive failed requests after which a model's remaining questions fail fast and its cells are reported as missing")
+    parser.add_argument("--max-connections", type=int, default=256, help="Connection pool size of the OpenRouter client")
+    parser.add_argument("--max-keepalive", type=int, default=64, help="Idle connections kept open for reuse")
+    parser.add_argument("--connect-timeout", type=float, default=10.0, help="Seconds to wait for a connection")
+    parser.add_argument("--read-timeout", type=float, default=600.0, help="Seconds to wait for a response")
+    parser.add_argument("--stream", action="store_true", help="Stream responses and stop each generation once its [/answer] tag arrives")
+    parser.add_argument("--no-http2", action="store_true", help="Use HTTP/1.1 for OpenRouter requests")
+    args = parser.parse_args()
+    if args.adaptive and (args.workers is not None or args.join_queue):
+        parser.error("--adaptive cannot be combined with --workers or --join-queue")
+    return args
+
+async def main(args):
+    # Imported here so --list does not pay for the API client, pandas and Arrow
+    from benchmark_suite import BenchmarkSuite
+    from http_transport import HttpTransport
+    from api_handler import DEFAULT_BUDGETS
+
+    sampler = AdaptiveSampler(args.ci_width, args.sample_batch_size, args.min_samples) if args.adaptive else None
+    transport = HttpTransport(max_connections=args.max_connections, max_keepalive_connections=args.max_keepalive,
+                              connect_timeout=args.connect_timeout, read_timeout=args.read_timeout, http2=not args.no_http2)
+    budgets = {"model": {**DEFAULT_BUDGETS["model"], "tokens_per_minute": args.tokens_per_minute, "requests_per_minute": args.requests_per_minute}}
+    suite = BenchmarkSuite(cache_mode=args.cache_mode, cache_path=args.cache_path, cache_max_size_mb=args.cache_max_size_mb,
+                           cache_max_age_days=args.cache_max_age_days, offline=args.offline, budgets=budgets, journal_path=args.journal_path,
+                           prompt_table_dir=args.prompt_table_dir, metrics_path=args.metrics_path, sampler=sampler,
+                           manifest_dir=args.manifest_dir, transport=transport, stream=args.stream,
+                           question_batch_size=args.batch_questions, failure_threshold=args.failure_threshold)
+
+    if args.join_queue:
+        await suite.run_worker(args.join_queue)
+        return
 
     # Create Model instances using OpenRouter model ids and model release dates
     models = [
@@ -17,31 +97,28 @@ async def main():
         Model("mistralai/mistral-large", "2024-07-24")
     ]
 
-    # Specify which benchmarks to run
-    benchmark_ids = [
-        "MMLU-Pro",
-        "GPQA-Diamond",
-        "ChatbotArena",
-        "MATH-Hard",
-        "MuSR",
-        "ARC-Challenge",
-        "HellaSwag",
-        "LiveBench",
-        "MGSM"
-    ]
+    benchmark_ids = args.benchmarks
 
     # Specify the number of samples to draw from each benchmark
     samples_per_benchmark = 100
 
     # Run the benchmarks
-    results = await suite.run(models, benchmark_ids, samples_per_benchmark)
+    if args.workers is not None:
+        results = await suite.run_sharded(models, benchmark_ids, samples_per_benchmark, resume=args.resume or args.incremental,
+                                          workers=args.workers, queue_path=args.queue_path, chunk_size=args.chunk_size)
+    else:
+        results = await suite.run(models, benchmark_ids, samples_per_benchmark, resume=args.resume or args.incremental)
 
     # Print the results
     suite.print_results(results)
 
     # Save results to JSON
-    suite.save_results_to_json(results)
+    suite.save_results_to_json(results, merge=args.incremental)
 
 if __name__ == "__main__":
+    args = parse_args()
+    if args.list:
+        print("\n".join(BENCHMARK_REGISTRY))
+        raise SystemExit
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(args))
\ No newline at end of file
@@ -0,0 +1,88 @@
+import os
+import asyncio
+import hashlib
+from typing import List
+import pandas as pd
+import pyarrow as pa
+from prompt_table import hash_benchmark_source
+
+NORMALIZED_FILE = "normalized.arrow"
+FINGERPRINT_KEY = b"source_fingerprint"
+
+
+def source_fingerprint(benchmark) -> str:
+    """Hash of the downloaded source files (path, size, mtime) and the benchmark's code."""
+    digest = hashlib.sha256(benchmark.id.encode("utf-8"))
+    for root, dirs, files in os.walk(benchmark.data_dir):
+        dirs[:] = sorted(d for d in dirs if d != ".git")
+        for filename in sorted(files):
+            if filename.startswith(NORMALIZED_FILE):
+                continue
+            path = os.path.join(root, filename)
+            stat = os.stat(path)
+            digest.update(f"{os.path.relpath(path, benchmark.data_dir)}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode("utf-8"))
+    hash_benchmark_source(digest, benchmark)
+    return digest.hexdigest()[:16]
+
+
+def frame_to_table(df: pd.DataFrame, row_keys: List[str], strata) -> pa.Table:
+    df = df.reset_index(drop=True)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Columns mixing Python types cannot be inferred, store them as text
+        mixed = [column for column in df.columns if df[column].dtype == object]
+        table = pa.Table.from_pandas(df.astype({column: str for column in mixed}), preserve_index=False)
+    stratum = pa.nulls(len(row_keys), pa.string()) if strata is None else pa.array([str(value) for value in strata], pa.string())
+    return table.append_column("row_key", pa.array(row_keys, pa.string())).append_column("stratum", stratum)
+
+
+def write_table(table: pa.Table, path: str, fingerprint: str):
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), FINGERPRINT_KEY: fingerprint.encode("utf-8")})
+    partial_path = path + ".part"
+    with pa.OSFile(partial_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(partial_path, path)
+
+
+def open_table(path: str) -> pa.Table:
+    # Memory-mapped, columns are only paged in when a slice of them is read
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+async def load_normalized(benchmark) -> pa.Table:
+    """The benchmark's dataset as one Arrow table with `row_key` and `stratum` columns.
+
+    The table is built from get_dataset() once per change of the source files
+    or benchmark code and written next to them as an Arrow IPC file. Later runs
+    memory-map that file instead of parsing the raw files again.
+    """
+    if benchmark.data_dir is None:
+        # Benchmarks without downloaded files are normalized in memory only
+        df = await benchmark.get_dataset()
+        strata = df[benchmark.stratify_by] if benchmark.stratify_by in df.columns else None
+        return frame_to_table(df, benchmark.get_row_keys(df), strata)
+
+    path = os.path.join(benchmark.data_dir, NORMALIZED_FILE)
+    fingerprint = await asyncio.to_thread(source_fingerprint, benchmark)
+    if os.path.exists(path):
+        table = await asyncio.to_thread(open_table, path)
+        if (table.schema.metadata or {}).get(FINGERPRINT_KEY) == fingerprint.encode("utf-8"):
+            return table
+
+    df = await benchmark.get_dataset()
+
+    def normalize():
+        row_keys = benchmark.get_row_keys(df)
+        strata = df[benchmark.stratify_by] if benchmark.stratify_by in df.columns else None
+        write_table(frame_to_table(df, row_keys, strata), path, fingerprint)
+        return open_table(path)
+
+    return await asyncio.to_thread(normalize)
+
+
+def table_slice(table: pa.Table, positions: List[int]) -> pd.DataFrame:
+    """Materialize only the given rows as a DataFrame indexed by row key."""
+    df = table.take(pa.array(positions, pa.int64())).to_pandas()
+    return df.drop(columns=["stratum"]).set_index("row_key")
@@ -0,0 +1,132 @@
+"""Micro-benchmark for answer extraction throughput on a synthetic response corpus.
+
+Before timing anything it checks the extraction of answers that are easy to get
+wrong, such as numbers written in the formats of the MGSM locales, and exits
+with an error if any of them regressed.
+
+Run from the repository root:
+
+    python -m perf.answer_extraction_bench --responses 100000
+"""
+import argparse
+import random
+import sys
+import time
+from answer_extraction import extract_numbered_answers, extract_tagged_answers, normalize_latex, normalize_number, normalize_numbers
+from benchmarks.math_hard_benchmark import MathHardBenchmark
+from benchmarks.mgsm_benchmark import MGSMBenchmark
+
+REASONING = (
+    "Let us consider the problem step by step. First we note that the quantity in question "
+    "depends on the previous result, so we compute 12 * 7 = 84 and subtract 9 to get 75. "
+)
+# Answers as the MGSM languages write them, with the value normalize_number must read from each
+LOCALE_NUMBERS = [
+    ("12500", 12500.0),
+    ("12,500", 12500.0),
+    ("12 500", 12500.0),
+    ("12\u00a0500", 12500.0),
+    ("12\u202f500", 12500.0),
+    ("1 234 567", 1234567.0),
+    ("1.234.567", 1234567.0),
+    ("1,5", 1.5),
+    ("0,75", 0.75),
+    ("1.5", 1.5),
+    ("1,234.5", 1234.5),
+    ("1.234,5", 1234.5),
+    ("12 500,5", 12500.5),
+    ("-3,25", -3.25),
+    ("Die Antwort ist 12 500.", 12500.0),
+    ("Ella tiene 1,5 litros", 1.5),
+]
+# Batched responses with the answers extract_numbered_answers must find in each
+NUMBERED_RESPONSES = [
+    ("[answer 1]A[/answer 1] [answer 2]B[/answer 2]", ["A", "B"]),
+    ("[answer 1]A[/answer] [ANSWER 2] B [/answer 2]", ["A", "B"]),
+    ("[answer 1]A [answer 2]B[/answer 2]", [None, "B"]),
+    ("[answer 1]A[/answer 2] [answer 2]B[/answer 2]", [None, "B"]),
+    ("[answer 2]B[/answer 2] [answer 1]A[/answer 1]", ["A", "B"]),
+]
+LATEX_ANSWERS = ["\\frac{3}{4}", "\\dfrac{1}{2}", "2\\sqrt{5}", "90^\\circ", "\\left(1, 2\\right)", "\\text{(B)}", "17"]
+
+
+def build_corpus(size: int, seed: int = 1337):
+    rng = random.Random(seed)
+    responses = []
+    gold = []
+    for _ in range(size):
+        answer = rng.choice(LATEX_ANSWERS + [str(rng.randint(-5000, 5000))])
+        reasoning = REASONING * rng.randint(1, 8)
+        if rng.random() < 0.1:
+            responses.append(f"{reasoning}The answer is $\\boxed{{{answer}}}$.")  # Untagged
+        else:
+            responses.append(f"{reasoning}[answer]{answer}[/answer]")
+        gold.append(answer)
+    return responses, gold
+
+
+def legacy_parse(response: str) -> str:
+    start_index = response.find("[answer]")
+    end_index = response.find("[/answer]")
+    if start_index != -1 and end_index != -1:
+        return response[start_index + len("[answer]"):end_index].strip()
+    return response
+
+
+def legacy_number(text: str):
+    cleaned_text = ''.join(char for char in text if char in '0123456789.')
+    return float(cleaned_text) if cleaned_text and cleaned_text.count('.') <= 1 else None
+
+
+def check_answers() -> bool:
+    ok = True
+    for text, expected in LOCALE_NUMBERS:
+        value = normalize_number(text)
+        if value != expected:
+            print(f"normalize_number({text!r}) returned {value}, expected {expected}")
+            ok = False
+    for response, expected in NUMBERED_RESPONSES:
+        answers = extract_numbered_answers(response, len(expected))
+        if answers != expected:
+            print(f"extract_numbered_answers({response!r}) returned {answers}, expected {expected}")
+            ok = False
+    return ok
+
+
+def timed(name: str, size: int, func, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+    print(f"{name:<32} {best:>9.3f}s {size / best:>14,.0f} responses/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure answer extraction throughput")
+    parser.add_argument("--responses", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if not check_answers():
+        sys.exit(1)
+    responses, gold = build_corpus(args.responses)
+    answers = extract_tagged_answers(responses)
+    math_benchmark = MathHardBenchmark()
+    mgsm_benchmark = MGSMBenchmark()
+
+    print(f"Corpus: {len(responses):,} responses, {sum(map(len, responses)) / 1e6:.1f} MB")
+    print(f"{'stage':<32} {'best':>10} {'throughput':>25}")
+    timed("legacy str.find parse", len(responses), lambda: [legacy_parse(r) for r in responses], args.repeat)
+    timed("extract_tagged_answers", len(responses), lambda: extract_tagged_answers(responses), args.repeat)
+    timed("legacy char-filter number", len(answers), lambda: [legacy_number(a) for a in answers], args.repeat)
+    timed("normalize_numbers", len(answers), lambda: normalize_numbers(answers), args.repeat)
+    timed("normalize_latex", len(answers), lambda: [normalize_latex(a) for a in answers], args.repeat)
+    timed("MATH-Hard check_answers", len(answers), lambda: math_benchmark.check_answers(answers, gold), args.repeat)
+    timed("MGSM check_answers", len(answers), lambda: mgsm_benchmark.check_answers(answers, gold), args.repeat)
+    timed("MATH-Hard parse + grade", len(responses),
+          lambda: math_benchmark.check_answers(math_benchmark.parse_model_answers(responses), gold), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
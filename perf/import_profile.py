@@ -0,0 +1,56 @@
+"""Import-time profile of the suite's entry points.
+
+Each target runs in a fresh interpreter with -X importtime. The total wall
+time and the slowest imports by cumulative time are reported. Run from the
+repository root:
+
+    python -m perf.import_profile
+    python -m perf.import_profile --benchmarks MMLU-Pro GPQA-Diamond --top 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from benchmarks.registry import BENCHMARK_REGISTRY
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def profile(name: str, command: list, top: int):
+    start_time = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", *command], cwd=REPO_ROOT, capture_output=True, text=True)
+    wall_time = time.perf_counter() - start_time
+    if completed.returncode != 0:
+        print(f"{name}: failed\n{completed.stderr[-2000:]}")
+        return
+
+    # Lines look like "import time:  self [us] |  cumulative | imported package"
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        imports.append((int(cumulative_us), int(self_us), module[1:].rstrip()))
+
+    # Nested imports are indented, top-level ones add up to the total import time
+    top_level = sum(cumulative for cumulative, _, module in imports if not module.startswith(" "))
+    print(f"{name}: {wall_time * 1000:.0f} ms wall, {top_level / 1000:.0f} ms importing {len(imports)} modules")
+    for cumulative, self_us, module in sorted(imports, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:>8.1f} ms {self_us / 1000:>8.1f} ms  {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of the suite's entry points")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARK_REGISTRY), default=list(BENCHMARK_REGISTRY))
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports shown per target")
+    args = parser.parse_args()
+
+    profile("main.py --list", ["main.py", "--list"], args.top)
+    profile("benchmark_suite", ["-c", "import benchmark_suite"], args.top)
+    for benchmark_id in args.benchmarks:
+        profile(benchmark_id, ["-c", f"from benchmarks.registry import load_benchmark_class; load_benchmark_class({benchmark_id!r})"], args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Local OpenAI-compatible stand-in for the OpenRouter API.
+
+Serves /api/v1/chat/completions with a log-normal latency distribution,
+injected 429 and 5xx responses and canned answers, so the suite's own overhead
+can be measured without spending anything. Streamed requests get SSE chunks,
+optionally with text after the answer to mimic verbose models. Run from the
+repository root:
+
+    python -m perf.mock_openrouter --port 8765 --latency-median 0.5 --rate-limit-rate 0.02
+    python -m perf.mock_openrouter --chunk-delay 0.02 --trailing-words 200
+    python -m perf.mock_openrouter --unavailable-models mistralai/mistral-large
+    OPENROUTER_BASE_URL=http://127.0.0.1:8765/api/v1 OPENROUTER_API_KEY=mock python main.py
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from aiohttp import web
+
+DEFAULT_ANSWERS = ["A", "B", "C", "D", "42", "\\frac{1}{2}"]
+WORDS_PER_CHUNK = 5
+BATCH_QUESTION_PATTERN = re.compile(r"^Question (\d+):$", re.MULTILINE)
+
+
+class MockOpenRouter:
+    def __init__(self, latency_median: float = 0.5, latency_sigma: float = 0.5, rate_limit_rate: float = 0.0,
+                 server_error_rate: float = 0.0, retry_after: float = 1.0, answers=None, reasoning_words: int = 50, seed: int = 1337,
+                 chunk_delay: float = 0.0, trailing_words: int = 0, missing_answer_rate: float = 0.0, unavailable_models=None,
+                 stream_error_rate: float = 0.0):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.retry_after = retry_after
+        self.answers = answers or DEFAULT_ANSWERS
+        self.reasoning = " ".join(["step"] * reasoning_words)
+        self.trailing = " ".join(["verbose"] * trailing_words)
+        # Seconds between streamed chunks, non-streamed responses wait for all chunks to be generated
+        self.chunk_delay = chunk_delay
+        # Fraction of the answers left out of responses to batched prompts
+        self.missing_answer_rate = missing_answer_rate
+        # Models that answer every request with a 503, to exercise the client's circuit breakers
+        self.unavailable_models = set(unavailable_models or ())
+        # Fraction of streamed responses that end in an error event after their first chunk
+        self.stream_error_rate = stream_error_rate
+        self.rng = random.Random(seed)
+        self.stats = {"requests": 0, "completions": 0, "rate_limited": 0, "server_errors": 0, "in_flight": 0,
+                      "max_in_flight": 0, "latency_total": 0.0, "streams_cancelled": 0, "stream_errors": 0, "started_at": time.time()}
+
+    def sample_latency(self) -> float:
+        if self.latency_median <= 0:
+            return 0.0
+        return self.rng.lognormvariate(math.log(self.latency_median), self.latency_sigma)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/api/v1/models", self.models)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+    async def chat_completions(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.stats["requests"] += 1
+
+        if body["model"] in self.unavailable_models:
+            self.stats["server_errors"] += 1
+            return web.json_response({"error": {"message": "No endpoints available for this model", "code": 503}}, status=503)
+
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return web.json_response({"error": {"message": "Rate limit exceeded", "code": 429}}, status=429,
+                                     headers={"Retry-After": f"{self.retry_after:g}"})
+        if roll < self.rate_limit_rate + self.server_error_rate:
+            self.stats["server_errors"] += 1
+            return web.json_response({"error": {"message": "Upstream error", "code": 502}}, status=502)
+
+        prompt = body["messages"][-1]["content"]
+        questions = len(BATCH_QUESTION_PATTERN.findall(prompt))
+        if questions > 1:
+            answers = [f"[answer {i}]{self.rng.choice(self.answers)}[/answer {i}]" for i in range(1, questions + 1)
+                       if self.rng.random() >= self.missing_answer_rate]
+            content = f"{self.reasoning}\n" + " ".join(answers)
+        else:
+            content = f"{self.reasoning}\n[answer]{self.rng.choice(self.answers)}[/answer]"
+        if self.trailing:
+            content += f"\n{self.trailing}"
+        words = content.split(" ")
+        chunks = [" ".join(words[i:i + WORDS_PER_CHUNK]) + " " for i in range(0, len(words), WORDS_PER_CHUNK)]
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        completion_id = f"gen-{uuid.uuid4().hex}"
+
+        latency = self.sample_latency()
+        self.stats["in_flight"] += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+        try:
+            if body.get("stream"):
+                return await self.stream_completion(request, body, completion_id, chunks, usage, latency)
+            latency += self.chunk_delay * len(chunks)
+            await asyncio.sleep(latency)
+        finally:
+            self.stats["in_flight"] -= 1
+        self.stats["completions"] += 1
+        self.stats["latency_total"] += latency
+
+        return web.json_response({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    async def stream_completion(self, request: web.Request, body: dict, completion_id: str, chunks, usage: dict,
+                                latency: float) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        start_time = time.perf_counter()
+
+        def event(delta: dict = None, finish_reason: str = None, usage: dict = None) -> bytes:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": body["model"],
+                     "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            if usage is not None:
+                chunk["usage"] = usage
+            return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+        fail_stream = self.rng.random() < self.stream_error_rate
+        try:
+            await asyncio.sleep(latency)
+            for i, text in enumerate(chunks):
+                if i:
+                    await asyncio.sleep(self.chunk_delay)
+                    if fail_stream:
+                        # The HTTP status is already 200, so providers report failures as an error event
+                        self.stats["stream_errors"] += 1
+                        error = {"error": {"message": "Upstream provider error", "code": 502}}
+                        await response.write(f"data: {json.dumps(error)}\n\n".encode("utf-8"))
+                        await response.write_eof()
+                        return response
+                await response.write(event({"role": "assistant", "content": text} if i == 0 else {"content": text}))
+            await response.write(event({}, "stop"))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                await response.write(event(usage=usage))
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except ConnectionResetError:
+            # The client stopped reading, a real provider would stop generating here
+            self.stats["streams_cancelled"] += 1
+        finally:
+            self.stats["completions"] += 1
+            self.stats["latency_total"] += time.perf_counter() - start_time
+        return response
+
+    async def models(self, request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": []})
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a mock OpenRouter chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-median", type=float, default=0.5, help="Median response time in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal shape of the response time distribution")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with a 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="Fraction of requests answered with a 502")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with every 429")
+    parser.add_argument("--answers", nargs="+", default=None, help="Canned answers, one is picked per response")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between chunks of a streamed response")
+    parser.add_argument("--trailing-words", type=int, default=0, help="Words generated after the closing answer tag")
+    parser.add_argument("--missing-answer-rate", type=float, default=0.0, help="Fraction of answers left out of batched responses")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="Fraction of streamed responses cut off by an error event")
+    parser.add_argument("--unavailable-models", nargs="+", default=None, help="Model ids answered with a 503 on every request")
+    parser.add_argument("--seed", type=int, default=1337)
+    return parser.parse_args(argv)
+
+
+def serve(args):
+    server = MockOpenRouter(args.latency_median, args.latency_sigma, args.rate_limit_rate, args.server_error_rate,
+                            args.retry_after, args.answers, seed=args.seed, chunk_delay=args.chunk_delay,
+                            trailing_words=args.trailing_words, missing_answer_rate=args.missing_answer_rate,
+                            unavailable_models=args.unavailable_models, stream_error_rate=args.stream_error_rate)
+    web.run_app(server.make_app(), host=args.host, port=args.port, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    serve(parse_args())
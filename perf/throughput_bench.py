@@ -0,0 +1,213 @@
+"""End-to-end throughput benchmark of BenchmarkSuite.run against the mock OpenRouter server.
+
+Runs N models x M synthetic benchmarks x K samples with no caching and reports
+requests/sec, scheduler overhead, memory high-water mark and time to first
+result. Run from the repository root:
+
+    python -m perf.throughput_bench --models 8 --benchmarks 7 --samples 100 --latency-median 0.2
+    python -m perf.throughput_bench --rate-limit-rate 0.05 --server-error-rate 0.01 --output perf-results.jsonl
+    python -m perf.throughput_bench --chunk-delay 0.02 --trailing-words 300 --stream
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import urllib.request
+import pandas as pd
+from benchmarks.base_benchmark import BaseBenchmark
+from model import Model
+from perf import mock_openrouter
+
+
+class SyntheticBenchmark(BaseBenchmark):
+    benchmark_id = "Synthetic"
+    rows = 100
+
+    def __init__(self):
+        super().__init__()
+        self.id = self.benchmark_id
+
+    async def setup(self):
+        pass
+
+    async def get_dataset(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            # Prompts differ between the synthetic benchmarks, otherwise the client coalesces them into one request
+            "question": [f"{self.benchmark_id} question {i}: " + "Which option is right? " * (i % 20 + 1) for i in range(self.rows)],
+            "answer": ["ABCD"[i % 4] for i in range(self.rows)],
+        })
+
+    def get_question(self, row) -> str:
+        return row["question"]
+
+    def get_correct_answer(self, row) -> str:
+        return row["answer"]
+
+    def check_answer(self, model_answer: str, correct_answer: str) -> bool:
+        return model_answer.strip().upper() == correct_answer
+
+
+def make_benchmarks(count: int, rows: int):
+    return {
+        f"Synthetic-{i}": type(f"SyntheticBenchmark{i}", (SyntheticBenchmark,), {"benchmark_id": f"Synthetic-{i}", "rows": rows})
+        for i in range(count)
+    }
+
+
+def start_mock_server(args) -> multiprocessing.Process:
+    # The server gets its own process so its CPU and memory do not count against the suite
+    server_args = mock_openrouter.parse_args([
+        "--port", str(args.port),
+        "--latency-median", str(args.latency_median),
+        "--latency-sigma", str(args.latency_sigma),
+        "--rate-limit-rate", str(args.rate_limit_rate),
+        "--server-error-rate", str(args.server_error_rate),
+        "--retry-after", str(args.retry_after),
+        "--chunk-delay", str(args.chunk_delay),
+        "--trailing-words", str(args.trailing_words),
+        "--stream-error-rate", str(args.stream_error_rate),
+    ])
+    process = multiprocessing.Process(target=mock_openrouter.serve, args=(server_args,), daemon=True)
+    process.start()
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            get_server_stats(args.port)
+            return process
+        except OSError:
+            if time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError(f"Mock server did not start on port {args.port}")
+            time.sleep(0.05)
+
+
+def get_server_stats(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=1) as response:
+        return json.load(response)
+
+
+def max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024  # Bytes on macOS, KiB on Linux
+
+
+async def run_suite(args, work_dir: str) -> dict:
+    from benchmark_suite import BenchmarkSuite
+
+    benchmarks = make_benchmarks(args.benchmarks, args.samples)
+    models = [Model(f"mock{i % args.providers}/model-{i}", "2024-01-01") for i in range(args.models)]
+    budgets = {"model": {"max_concurrency": args.concurrency, "tokens_per_minute": args.tokens_per_minute,
+                         "requests_per_minute": args.requests_per_minute}}
+    suite = BenchmarkSuite(cache_mode="bypass", budgets=budgets, journal_path=os.path.join(work_dir, "journal.jsonl"),
+                           stream=args.stream)
+    suite.all_benchmarks.update(benchmarks)
+
+    first_result = {}
+    append = suite.journal.append
+
+    def timed_append(record):
+        first_result.setdefault("at", time.perf_counter())
+        append(record)
+
+    suite.journal.append = timed_append
+
+    start_time = time.perf_counter()
+    start_cpu = time.process_time()
+    await suite.run(models, list(benchmarks), args.samples)
+    wall_time = time.perf_counter() - start_time
+    cpu_time = time.process_time() - start_cpu
+
+    response_time = suite.telemetry.response_time.series.values()
+    return {
+        "wall_time": wall_time,
+        "cpu_time": cpu_time,
+        "time_to_first_result": first_result.get("at", start_time) - start_time,
+        "client_response_time": sum(series["sum"] for series in response_time),
+        "client_responses": sum(series["count"] for series in response_time),
+        "connections_opened": suite.transport.api_stats.new_connections,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure suite throughput against a mock OpenRouter server")
+    parser.add_argument("--models", type=int, default=8)
+    parser.add_argument("--benchmarks", type=int, default=7)
+    parser.add_argument("--samples", type=int, default=100, help="Questions per benchmark")
+    parser.add_argument("--providers", type=int, default=4, help="Models are spread over this many providers")
+    parser.add_argument("--concurrency", type=int, default=8, help="Per-model concurrency budget")
+    parser.add_argument("--tokens-per-minute", type=int, default=None, help="Per-model token budget")
+    parser.add_argument("--requests-per-minute", type=int, default=None, help="Per-model request budget")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-median", type=float, default=0.2)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--server-error-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between chunks of a streamed response")
+    parser.add_argument("--trailing-words", type=int, default=0, help="Words the mock generates after the closing answer tag")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="Fraction of streamed responses the mock cuts off with an error event")
+    parser.add_argument("--stream", action="store_true", help="Run the suite in streaming mode")
+    parser.add_argument("--output", default=None, help="Append the results as one JSON line to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix="throughput-bench-")
+    os.environ["BENCHMARK_AGGREGATOR_CACHE"] = work_dir
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{args.port}/api/v1"
+    os.environ["OPENROUTER_API_KEY"] = "mock"
+
+    server = start_mock_server(args)
+    try:
+        measured = asyncio.run(run_suite(args, work_dir))
+        server_stats = get_server_stats(args.port)
+    finally:
+        server.terminate()
+        server.join()
+
+    completions = server_stats["completions"]
+    mean_latency = server_stats["latency_total"] / completions if completions else 0.0
+    # With every lane saturated the run cannot finish faster than this
+    ideal_time = server_stats["latency_total"] / (args.models * args.concurrency)
+    client_overhead = (measured["client_response_time"] / measured["client_responses"] - mean_latency) if measured["client_responses"] else 0.0
+    results = {
+        "models": args.models,
+        "benchmarks": args.benchmarks,
+        "samples": args.samples,
+        "concurrency": args.concurrency,
+        "tokens_per_minute": args.tokens_per_minute,
+        "stream": args.stream,
+        "requests": server_stats["requests"],
+        "completions": completions,
+        "rate_limited": server_stats["rate_limited"],
+        "server_errors": server_stats["server_errors"],
+        "streams_cancelled": server_stats["streams_cancelled"],
+        "stream_errors": server_stats["stream_errors"],
+        "max_in_flight": server_stats["max_in_flight"],
+        "connections_opened": measured["connections_opened"],
+        "wall_time": round(measured["wall_time"], 3),
+        "cpu_time": round(measured["cpu_time"], 3),
+        "requests_per_second": round(server_stats["requests"] / measured["wall_time"], 1),
+        "time_to_first_result": round(measured["time_to_first_result"], 3),
+        "ideal_time": round(ideal_time, 3),
+        "scheduler_overhead": round(measured["wall_time"] - ideal_time, 3),
+        "client_overhead_ms": round(client_overhead * 1000, 2),
+        "max_rss_mb": round(max_rss_mb(), 1),
+    }
+
+    print()
+    for name, value in results.items():
+        print(f"{name:<22} {value}")
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(json.dumps({"timestamp": time.time(), **results}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import json
+import hashlib
+import inspect
+from typing import Any, Iterator, List, Optional, Tuple
+import pandas as pd
+import pyarrow as pa
+
+ITER_BATCH_SIZE = 1024
+
+
+def hash_benchmark_source(digest, benchmark):
+    # Source files of every class in the benchmark's hierarchy, so code changes invalidate derived data
+    source_files = {
+        value.__code__.co_filename
+        for klass in type(benchmark).__mro__ if klass is not object
+        for value in vars(klass).values() if inspect.isfunction(value)
+    }
+    for source_file in sorted(source_files):
+        with open(source_file, 'rb') as f:
+            digest.update(f.read())
+
+
+class PromptTable:
+    """Immutable table of (row_id, prompt, correct_answer, option_permutation) for one benchmark.
+
+    The table is materialized once per benchmark sample and shared by every
+    model, so all models see byte-identical prompts. It is backed by an Arrow
+    table and can be persisted as an Arrow IPC file that later runs memory-map
+    instead of formatting the prompts again.
+    """
+
+    def __init__(self, benchmark_id: str, table: pa.Table):
+        self.benchmark_id = benchmark_id
+        self.table = table
+
+    @classmethod
+    def build(cls, benchmark, df: pd.DataFrame) -> "PromptTable":
+        # Answers are kept as JSON so gold answers of any type survive the Arrow round trip
+        table = pa.table({
+            "row_id": [str(index) for index in df.index],
+            "prompt": benchmark.build_prompts(df),
+            "correct_answer": [json.dumps(answer, default=str) for answer in benchmark.get_correct_answers(df)],
+            "option_permutation": benchmark.get_option_permutations(df),
+        }, schema=pa.schema([
+            ("row_id", pa.string()),
+            ("prompt", pa.string()),
+            ("correct_answer", pa.string()),
+            ("option_permutation", pa.list_(pa.int32())),
+        ]))
+        return cls(benchmark.id, table)
+
+    @staticmethod
+    def fingerprint(benchmark, df: pd.DataFrame) -> str:
+        # Prompts depend on the sampled rows and on the benchmark's formatting code
+        digest = hashlib.sha256(benchmark.id.encode("utf-8"))
+        for row_id in df.index:
+            digest.update(str(row_id).encode("utf-8") + b"\0")
+        hash_benchmark_source(digest, benchmark)
+        return digest.hexdigest()[:16]
+
+    @classmethod
+    def load_or_build(cls, benchmark, df: pd.DataFrame, directory: str = None) -> "PromptTable":
+        if directory is None:
+            return cls.build(benchmark, df)
+        path = os.path.join(directory, f"{benchmark.id}-{cls.fingerprint(benchmark, df)}.arrow")
+        if os.path.exists(path):
+            return cls.load(benchmark.id, path)
+        prompt_table = cls.build(benchmark, df)
+        prompt_table.save(path)
+        return prompt_table
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        partial_path = path + ".part"
+        with pa.OSFile(partial_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, self.table.schema) as writer:
+                writer.write_table(self.table)
+        os.replace(partial_path, path)
+
+    @classmethod
+    def load(cls, benchmark_id: str, path: str) -> "PromptTable":
+        source = pa.memory_map(path, 'r')
+        return cls(benchmark_id, pa.ipc.open_file(source).read_all())
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def __iter__(self) -> Iterator[Tuple[str, str, Any, Optional[List[int]]]]:
+        # Small batches keep only a slice of the table as Python objects at any time
+        for batch in self.table.to_batches(max_chunksize=ITER_BATCH_SIZE):
+            columns = [batch.column(name).to_pylist() for name in ("row_id", "prompt", "correct_answer", "option_permutation")]
+            for row_id, prompt, correct_answer, permutation in zip(*columns):
+                yield row_id, prompt, json.loads(correct_answer), permutation
+
+    def slice(self, start: int, stop: int) -> "PromptTable":
+        return PromptTable(self.benchmark_id, self.table.slice(start, stop - start))
+
+    @property
+    def row_ids(self) -> List[str]:
+        return self.table.column("row_id").to_pylist()
@@ -0,0 +1,178 @@
+from benchmark_suite import SCORE_ONLY_BENCHMARKS
+from benchmarks.registry import BENCHMARK_REGISTRY, load_benchmark_class
+from dataset_store import DatasetStore
+from normalized_dataset import load_normalized, table_slice
+from results_journal import ResultsJournal, SINGLE_MODE
+from adaptive_sampling import wilson_interval
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import Dict, List, Tuple
+import pandas as pd
+import argparse
+import asyncio
+import json
+import os
+
+_benchmarks = {}
+
+def get_benchmark(benchmark_id: str):
+    # Each worker process imports only the benchmarks it grades, once
+    if benchmark_id not in _benchmarks:
+        _benchmarks[benchmark_id] = load_benchmark_class(benchmark_id)()
+    return _benchmarks[benchmark_id]
+
+def grade_chunk(benchmark_id: str, responses: List[str], correct_answers: List, answer_indices: List = None) -> Tuple[List[str], List[bool]]:
+    benchmark = get_benchmark(benchmark_id)
+    if answer_indices is not None:
+        answers = benchmark.parse_batched_answers(responses, answer_indices)
+    else:
+        answers = benchmark.parse_model_answers(responses)
+    return answers, benchmark.check_answers(answers, correct_answers)
+
+async def load_benchmark_answers(benchmark_id: str, store: DatasetStore, chunk_size: int = 10000) -> Dict[str, object]:
+    benchmark = load_benchmark_class(benchmark_id)()
+    benchmark.store = store
+    await benchmark.setup()
+    try:
+        table = await load_normalized(benchmark)
+    finally:
+        await benchmark.cleanup()
+    answers = {}
+    # Only the gold answers are needed, so the memory-mapped table is materialized a slice at a time
+    for start in range(0, table.num_rows, chunk_size):
+        df = table_slice(table, list(range(start, min(start + chunk_size, table.num_rows))))
+        answers.update(zip(df.index, benchmark.get_correct_answers(df)))
+    return answers
+
+async def load_correct_answers(benchmark_ids: List[str]) -> Dict[str, Dict[str, object]]:
+    # Recompute gold answers from the datasets already in the local store, never from the network
+    store = DatasetStore(offline=True)
+    # Score-only benchmarks have no gold answers and their published scores are only available online
+    benchmark_ids = [bid for bid in benchmark_ids if bid in BENCHMARK_REGISTRY and bid not in SCORE_ONLY_BENCHMARKS]
+    answers = await asyncio.gather(*(load_benchmark_answers(benchmark_id, store) for benchmark_id in benchmark_ids))
+    return dict(zip(benchmark_ids, answers))
+
+def submit_frame(df: pd.DataFrame, executor: ProcessPoolExecutor, chunk_size: int, correct_answers: Dict[str, Dict[str, object]] = None):
+    question_rows = df[df["row_id"].notna() & df["response"].notna()]
+    futures = []
+    for benchmark_id, group in question_rows.groupby("benchmark"):
+        if benchmark_id in SCORE_ONLY_BENCHMARKS:
+            continue
+        if correct_answers is not None and benchmark_id in correct_answers:
+            gold = group["row_id"].map(correct_answers[benchmark_id])
+            df.loc[group.index, "correct_answer"] = gold.map(lambda answer: None if answer is None else str(answer))
+        else:
+            gold = group["correct_answer"]
+        # Records of batched prompts hold the whole response and the number of their answer tag
+        batched = "answer_index" in group.columns and group["answer_index"].notna().any()
+        for start in range(0, len(group), chunk_size):
+            index = group.index[start:start + chunk_size]
+            answer_indices = [None if pd.isna(answer_index) else int(answer_index) for answer_index in group.loc[index, "answer_index"]] if batched else None
+            future = executor.submit(grade_chunk, benchmark_id, group.loc[index, "response"].tolist(), gold.loc[index].tolist(), answer_indices)
+            futures.append((index, future))
+    return df, futures
+
+def finish_frame(df: pd.DataFrame, futures) -> pd.DataFrame:
+    for index, future in futures:
+        answers, correct = future.result()
+        df.loc[index, "answer"] = answers
+        df.loc[index, "correct"] = correct
+    return df
+
+def regrade_frames(journal: ResultsJournal, executor: ProcessPoolExecutor, workers: int, chunk_size: int, correct_answers: Dict[str, Dict[str, object]] = None):
+    # Keep a few stored parts in flight so every worker stays busy without loading the whole store
+    pending = deque()
+    for df in journal.iter_frames():
+        pending.append(submit_frame(df, executor, chunk_size, correct_answers))
+        if len(pending) > workers * 2:
+            yield finish_frame(*pending.popleft())
+    while pending:
+        yield finish_frame(*pending.popleft())
+
+def tally_modes(journal: ResultsJournal) -> Tuple[Dict[Tuple[str, str, str], float], Dict[Tuple[str, str, str], Tuple[int, int]]]:
+    # Scores and counts per (model, benchmark, mode), mode is None for single-question prompts like in data.json
+    benchmark_modes = set()
+    for df in journal.iter_frames(columns=["benchmark", "mode"]):
+        benchmark_modes.update(zip(df["benchmark"], df["mode"].astype(object).fillna(SINGLE_MODE)))
+    scores = {}
+    counts = {}
+    for mode in sorted({mode for _, mode in benchmark_modes}):
+        benchmarks = {benchmark for benchmark, benchmark_mode in benchmark_modes if benchmark_mode == mode}
+        mode_scores, mode_counts = journal.tally(modes={benchmark: mode for benchmark in benchmarks})
+        key_mode = None if mode == SINGLE_MODE else mode
+        for (model_id, benchmark_id), score in mode_scores.items():
+            if benchmark_id in benchmarks:
+                scores[(model_id, benchmark_id, key_mode)] = score
+                if (model_id, benchmark_id) in mode_counts:
+                    counts[(model_id, benchmark_id, key_mode)] = mode_counts[(model_id, benchmark_id)]
+    return scores, counts
+
+def update_leaderboard(scores: Dict[Tuple[str, str, str], float], filename: str, counts: Dict[Tuple[str, str, str], Tuple[int, int]] = None):
+    leaderboard = []
+    if os.path.exists(filename):
+        with open(filename, 'r') as f:
+            leaderboard = json.load(f)
+
+    by_model = {model_result["model"]: model_result for model_result in leaderboard}
+    for (model_id, benchmark_id, mode), score in scores.items():
+        model_result = by_model.get(model_id)
+        if model_result is None:
+            model_result = {"model": model_id, "releaseDate": "N/A", "benchmarks": []}
+            by_model[model_id] = model_result
+            leaderboard.append(model_result)
+        # Scores of different prompting modes are separate entries
+        benchmark_info = next((info for info in model_result["benchmarks"]
+                               if (info["name"], info.get("mode")) == (benchmark_id, mode)), None)
+        if benchmark_info is None:
+            benchmark_info = {"name": benchmark_id, "samplesDrawn": "N/A", "totalSamples": "N/A"}
+            if mode is not None:
+                benchmark_info["mode"] = mode
+            model_result["benchmarks"].append(benchmark_info)
+        count = counts.get((model_id, benchmark_id, mode)) if counts else None
+        # Same rule as BenchmarkSuite._is_missing, a score over part of the sample is not comparable
+        if benchmark_info.get("missing"):
+            print(f"  Skipping {model_id} {benchmark_id}, the run that wrote {filename} could not answer all of its questions")
+            continue
+        if count is not None and isinstance(benchmark_info["samplesDrawn"], int) and count[1] < benchmark_info["samplesDrawn"]:
+            print(f"  Skipping {model_id} {benchmark_id}, the journal has {count[1]} of its {benchmark_info['samplesDrawn']} answers")
+            continue
+        benchmark_info["score"] = round(score * 100, 2)
+        if count is not None:
+            benchmark_info["samplesDrawn"] = count[1]
+            ci_low, ci_high = wilson_interval(*count)
+            benchmark_info["ciLow"] = round(ci_low * 100, 2)
+            benchmark_info["ciHigh"] = round(ci_high * 100, 2)
+
+    with open(filename, 'w') as f:
+        json.dump(leaderboard, f, indent=2)
+
+    print(f"Results saved to {filename}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Re-score stored responses without querying any model")
+    parser.add_argument("--journal-path", default=None, help="Location of the per-question results journal")
+    parser.add_argument("--output", default="data.json", help="Leaderboard file to update with the new scores")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of grading processes")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Responses per grading task")
+    parser.add_argument("--refresh-gold", action="store_true",
+                        help="Recompute gold answers from the local dataset store instead of using the stored ones")
+    return parser.parse_args()
+
+def main(args):
+    journal = ResultsJournal(args.journal_path)
+
+    correct_answers = None
+    if args.refresh_gold:
+        benchmark_ids = sorted({benchmark_id for df in journal.iter_frames(columns=["benchmark"]) for benchmark_id in df["benchmark"].unique()})
+        correct_answers = asyncio.run(load_correct_answers(benchmark_ids))
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        journal.rewrite(regrade_frames(journal, executor, args.workers, args.chunk_size, correct_answers))
+
+    scores, counts = tally_modes(journal)
+    for (model_id, benchmark_id, mode), score in sorted(scores.items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or "")):
+        print(f"  {model_id} {benchmark_id}{f' ({mode})' if mode else ''}: {score:.2%}")
+    update_leaderboard(scores, args.output, counts)
+
+if __name__ == "__main__":
+    main(parse_args())
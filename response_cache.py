@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Optional, Dict, Any
+
+CACHE_MODES = ("read-through", "read-only", "bypass")
+
+
+def get_cache_dir(*parts: str) -> str:
+    base_dir = os.getenv("BENCHMARK_AGGREGATOR_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "benchmarkaggregator")
+    path = os.path.join(base_dir, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class ResponseCacheMiss(Exception):
+    pass
+
+
+class ResponseCache:
+    """On-disk cache of model responses keyed by (model, prompt, generation params).
+
+    Modes:
+      read-through  serve hits from disk, query and store misses
+      read-only     replay stored responses only, a miss raises ResponseCacheMiss
+      bypass        never read or write the cache
+    """
+
+    def __init__(self, path: str = None, mode: str = "read-through", max_size_mb: float = None, max_age_days: float = None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+        self.mode = mode
+        self.path = path or os.path.join(get_cache_dir(), "responses.sqlite")
+        self.max_size_mb = max_size_mb
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+        if self.mode != "bypass":
+            self._open()
+            self.evict()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, "
+            "size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+    @staticmethod
+    def make_key(model: str, prompt: str, params: Dict[str, Any] = None) -> str:
+        payload = json.dumps({"model": model, "prompt": prompt, "params": params or {}}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, model: str, prompt: str, params: Dict[str, Any] = None) -> Optional[str]:
+        if self.mode == "bypass":
+            return None
+        key = self.make_key(model, prompt, params)
+        row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            if self.mode == "read-only":
+                raise ResponseCacheMiss(f"No cached response for model {model} (key {key[:12]})")
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, model: str, prompt: str, response: str, params: Dict[str, Any] = None):
+        if self.mode != "read-through" or response is None:
+            return
+        key = self.make_key(model, prompt, params)
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, response, len(response.encode("utf-8")), now, now),
+        )
+
+    def evict(self):
+        if self.conn is None:
+            return
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            self.conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+        if self.max_size_mb is not None:
+            # Keep the most recently used entries until the size budget is spent
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS running FROM responses) "
+                "WHERE running > ?)",
+                (int(self.max_size_mb * 1024 * 1024),),
+            )
+
+    def close(self):
+        if self.conn is not None:
+            self.evict()
+            self.conn.close()
+            self.conn = None
+        if self.hits or self.misses:
+            print(f"Response cache: {self.hits} hits, {self.misses} misses")
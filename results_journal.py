@@ -0,0 +1,208 @@
+import os
+import json
+import glob
+import shutil
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+import pandas as pd
+import pyarrow.parquet as pq
+from response_cache import get_cache_dir
+
+RECORD_COLUMNS = ["model", "benchmark", "row_id", "response", "answer", "correct_answer", "correct", "latency", "score"]
+AGGREGATE_COLUMNS = ["model", "benchmark", "row_id", "correct", "score", "mode"]
+# Records without a mode come from single-question prompts
+SINGLE_MODE = "single"
+
+
+def in_mode(df: pd.DataFrame, modes: Dict[str, str] = None) -> pd.Series:
+    # Question records only count for a benchmark when they were asked in that benchmark's prompting mode
+    modes = modes or {}
+    expected = df["benchmark"].map(lambda benchmark: modes.get(benchmark, SINGLE_MODE))
+    return (df["row_id"].isna() | (df["mode"].astype(object).fillna(SINGLE_MODE) == expected)).astype(bool)
+
+
+class ResultsJournal:
+    """Streaming store of per-question results.
+
+    Graded questions are appended to a JSONL journal as each one finishes and
+    every `compact_every` records the journal is compacted into a columnar
+    Parquet part. Nothing is kept in memory, and scores for data.json are
+    recomputed from the stored records without any API calls. Score-only
+    benchmarks are stored as a single record with a `score` and no row_id.
+    """
+
+    def __init__(self, path: str = None, compact_every: int = 1000):
+        self.path = path or os.path.join(get_cache_dir("runs"), "journal.jsonl")
+        self.parts_dir = os.path.splitext(self.path)[0] + "_parts"
+        self.compact_every = compact_every
+        self.file = None
+        self.pending = 0
+
+    @staticmethod
+    def record_key(record: dict) -> Tuple[str, str, str]:
+        return record["model"], record["benchmark"], record["row_id"]
+
+    def _part_paths(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.parts_dir, "part-*.parquet")))
+
+    def _read_journal(self) -> List[dict]:
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # A run killed mid-write can leave a truncated last line
+        return records
+
+    @staticmethod
+    def _frame_from_records(records: List[dict]) -> pd.DataFrame:
+        # Gold and parsed answers differ in type between benchmarks, store them as text
+        for record in records:
+            for column in ("answer", "correct_answer", "row_id"):
+                if record.get(column) is not None:
+                    record[column] = str(record[column])
+        df = pd.DataFrame(records)
+        extra_columns = [column for column in df.columns if column not in RECORD_COLUMNS]
+        df = df.reindex(columns=RECORD_COLUMNS + extra_columns)
+        df["correct"] = df["correct"].astype("boolean")
+        return df
+
+    def iter_frames(self, columns: List[str] = None) -> Iterator[pd.DataFrame]:
+        for part_path in self._part_paths():
+            if columns is None:
+                yield pd.read_parquet(part_path)
+            else:
+                available = set(pq.read_schema(part_path).names)
+                df = pd.read_parquet(part_path, columns=[column for column in columns if column in available])
+                yield df.reindex(columns=columns)
+        records = self._read_journal()
+        if records:
+            df = self._frame_from_records(records)
+            yield df.reindex(columns=columns) if columns else df
+
+    def completed_keys(self, modes: Dict[str, str] = None) -> Set[Tuple[str, str, str]]:
+        # Score-only benchmarks are completed as (model, benchmark, None)
+        keys = set()
+        for df in self.iter_frames(columns=["model", "benchmark", "row_id", "mode"]):
+            df = df[in_mode(df, modes)]
+            row_ids = df["row_id"].astype(object).where(df["row_id"].notna(), None)
+            keys.update(zip(df["model"], df["benchmark"], row_ids))
+        return keys
+
+    def tally(self, row_ids_by_benchmark: Dict[str, Set[str]] = None, modes: Dict[str, str] = None) -> Tuple[Dict[Tuple[str, str], float], Dict[Tuple[str, str], Tuple[int, int]]]:
+        """Scores and (correct, total) question counts per (model, benchmark).
+
+        `modes` maps a benchmark to the prompting mode whose records count, single-question records by default.
+        """
+        correct = {}
+        totals = {}
+        scores = {}
+        seen = set()
+        for df in self.iter_frames(columns=AGGREGATE_COLUMNS):
+            df = df[in_mode(df, modes)]
+            score_rows = df[df["row_id"].isna()]
+            for model, benchmark, score in zip(score_rows["model"], score_rows["benchmark"], score_rows["score"]):
+                scores[(model, benchmark)] = float(score)
+
+            question_rows = df[df["row_id"].notna()]
+            # A crash during compact() can leave the same records in a part and in the journal, count them once
+            is_new = []
+            for key in self._frame_keys(question_rows):
+                is_new.append(key not in seen)
+                seen.add(key)
+            question_rows = question_rows[pd.array(is_new, dtype=bool)]
+            if row_ids_by_benchmark is not None:
+                in_sample = [row_id in row_ids_by_benchmark.get(benchmark, ())
+                             for benchmark, row_id in zip(question_rows["benchmark"], question_rows["row_id"])]
+                question_rows = question_rows[pd.array(in_sample, dtype=bool)]
+            grouped = question_rows.assign(correct=question_rows["correct"].astype(bool)).groupby(["model", "benchmark"])["correct"]
+            for key, (count, total) in grouped.agg(["sum", "count"]).iterrows():
+                correct[key] = correct.get(key, 0) + int(count)
+                totals[key] = totals.get(key, 0) + int(total)
+
+        counts = {}
+        for key, total in totals.items():
+            if total:
+                scores[key] = correct[key] / total
+                counts[key] = (correct[key], total)
+        return scores, counts
+
+    def open(self, resume: bool = False):
+        if not resume:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            shutil.rmtree(self.parts_dir, ignore_errors=True)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def append(self, record: dict):
+        self.file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.file.flush()
+        self.pending += 1
+        if self.pending >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        was_open = self.file is not None
+        if was_open:
+            self.file.close()
+        records = self._read_journal()
+        if records:
+            self._write_part(self._frame_from_records(records))
+        # Only drop the journal once its records are safely in a Parquet part
+        open(self.path, 'w').close()
+        self.pending = 0
+        if was_open:
+            self.file = open(self.path, 'a', encoding='utf-8')
+
+    def _write_part(self, df: pd.DataFrame):
+        os.makedirs(self.parts_dir, exist_ok=True)
+        df.to_parquet(os.path.join(self.parts_dir, f"part-{len(self._part_paths()):05d}.parquet"), index=False)
+
+    @staticmethod
+    def _frame_keys(df: pd.DataFrame) -> List[tuple]:
+        row_ids = df["row_id"].astype(object).where(df["row_id"].notna(), None)
+        modes = df["mode"].astype(object).fillna(SINGLE_MODE) if "mode" in df.columns else [SINGLE_MODE] * len(df)
+        return list(zip(df["model"], df["benchmark"], row_ids, modes))
+
+    def merge(self, journals: Iterable["ResultsJournal"]) -> int:
+        """Add the records of other journals as new parts, skipping questions this journal already has.
+
+        Returns the number of records added. Must not be called while the journal is open.
+        """
+        seen = set()
+        for df in self.iter_frames(columns=["model", "benchmark", "row_id", "mode"]):
+            seen.update(self._frame_keys(df))
+        added = 0
+        for journal in journals:
+            for df in journal.iter_frames():
+                keys = self._frame_keys(df)
+                # A unit re-run after an expired lease can leave the same question in two shards
+                is_new = []
+                for key in keys:
+                    is_new.append(key not in seen)
+                    seen.add(key)
+                df = df[is_new]
+                if len(df):
+                    self._write_part(df)
+                    added += len(df)
+        return added
+
+    def rewrite(self, frames: Iterable[pd.DataFrame]):
+        # Frames are usually produced from iter_frames, so stage the new parts before swapping them in
+        staging_dir = self.parts_dir + ".staging"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(staging_dir)
+        for part_number, df in enumerate(frames):
+            df.to_parquet(os.path.join(staging_dir, f"part-{part_number:05d}.parquet"), index=False)
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+        os.replace(staging_dir, self.parts_dir)
+        open(self.path, 'w').close()
+
+    def close(self):
+        if self.file is not None:
+            self.compact()
+            self.file.close()
+            self.file = None
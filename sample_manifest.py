@@ -0,0 +1,101 @@
+import os
+import json
+import hashlib
+from typing import List, Optional
+import pandas as pd
+
+MANIFEST_VERSION = 1
+
+
+def rank_key(row_key: str, seed: int) -> str:
+    # A row's position in the shuffled order depends only on its own key, never on upstream row order
+    return hashlib.sha256(f"{seed}:{row_key}".encode("utf-8")).hexdigest()
+
+
+def allocate(counts: pd.Series, samples: int) -> pd.Series:
+    # Proportional allocation per stratum, remaining slots go to the largest remainders
+    quotas = counts / counts.sum() * samples
+    allocation = quotas.astype(int).clip(upper=counts)
+    remainders = (quotas - allocation).sort_values(ascending=False, kind="stable")
+    for stratum in remainders.index:
+        if allocation.sum() >= samples:
+            break
+        if allocation[stratum] < counts[stratum]:
+            allocation[stratum] += 1
+    return allocation
+
+
+class SampleManifest:
+    """Persisted list of the row keys drawn for one benchmark sample.
+
+    Row keys are stable hashes of each question's content, so a manifest keeps
+    selecting exactly the same questions when the upstream files are reordered
+    or extended. Samples are stratified by the benchmark's `stratify_by` column
+    (subject, language, ...) with proportional allocation. Manifests are plain
+    JSON and can be checked into version control and reused as-is.
+    """
+
+    def __init__(self, benchmark_id: str, samples: int, seed: int, row_keys: List[str], stratify_by: Optional[str] = None, strata: dict = None):
+        self.benchmark_id = benchmark_id
+        self.samples = samples
+        self.seed = seed
+        self.row_keys = row_keys
+        self.stratify_by = stratify_by
+        self.strata = strata or {}
+
+    @classmethod
+    def draw(cls, benchmark_id: str, df: pd.DataFrame, samples: int, seed: int = 1337, stratify_by: str = None) -> "SampleManifest":
+        ranks = pd.Series([rank_key(row_key, seed) for row_key in df.index], index=df.index).sort_values(kind="stable")
+        if stratify_by is None or stratify_by not in df.columns:
+            return cls(benchmark_id, samples, seed, list(ranks.index[:samples]))
+
+        strata = df[stratify_by].astype(str).reindex(ranks.index)
+        allocation = allocate(strata.value_counts(sort=False), samples)
+        chosen = []
+        for stratum, count in allocation.items():
+            chosen.extend(strata.index[strata == stratum][:count])
+        # Strata are interleaved in rank order, so any prefix of the sample stays a random draw
+        row_keys = sorted(chosen, key=ranks.__getitem__)
+        return cls(benchmark_id, samples, seed, row_keys, stratify_by, {str(k): int(v) for k, v in allocation.items() if v})
+
+    @staticmethod
+    def path_for(directory: str, benchmark_id: str, samples: int, seed: int) -> str:
+        return os.path.join(directory, f"{benchmark_id}-n{samples}-seed{seed}.json")
+
+    @classmethod
+    def load_or_draw(cls, benchmark, df: pd.DataFrame, samples: int, directory: str, seed: int = 1337) -> "SampleManifest":
+        path = cls.path_for(directory, benchmark.id, samples, seed)
+        if os.path.exists(path):
+            return cls.load(path)
+        manifest = cls.draw(benchmark.id, df, samples, seed, benchmark.stratify_by)
+        manifest.save(path)
+        return manifest
+
+    def positions(self, row_keys: pd.Index) -> List[int]:
+        """Positions of the manifest's rows within `row_keys`, in manifest order."""
+        lookup = pd.Series(range(len(row_keys)), index=row_keys)
+        present = [row_key for row_key in self.row_keys if row_key in lookup.index]
+        if len(present) < len(self.row_keys):
+            print(f"Warning: {len(self.row_keys) - len(present)} questions of the {self.benchmark_id} sample manifest are no longer in the dataset")
+        return lookup[present].tolist()
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        partial_path = path + ".part"
+        with open(partial_path, 'w') as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "benchmark": self.benchmark_id,
+                "samples": self.samples,
+                "seed": self.seed,
+                "stratify_by": self.stratify_by,
+                "strata": self.strata,
+                "row_keys": self.row_keys,
+            }, f, indent=2)
+        os.replace(partial_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SampleManifest":
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(data["benchmark"], data["samples"], data["seed"], data["row_keys"], data.get("stratify_by"), data.get("strata"))
@@ -0,0 +1,116 @@
+import time
+import asyncio
+from itertools import zip_longest
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List
+from tqdm import tqdm
+from model import Model
+
+
+class WorkItem:
+    def __init__(self, model: Model, benchmark_id: str, benchmark, row_id: str, prompt: str, correct_answer, unit_id: int = None,
+                 batch: List["WorkItem"] = None):
+        self.model = model
+        self.benchmark_id = benchmark_id
+        self.benchmark = benchmark
+        self.row_id = row_id
+        self.prompt = prompt
+        self.correct_answer = correct_answer
+        self.unit_id = unit_id  # Work queue unit of a sharded run
+        self.batch = batch  # Questions asked together in one request in batched mode
+
+
+class Barrier:
+    """Handed out by a lane that cannot produce its next item before earlier ones are done.
+
+    The worker that receives it waits for `event` and then pulls from the lane again.
+    """
+
+    def __init__(self, event: asyncio.Event):
+        self.event = event
+
+
+def batch_work_items(items: Iterator[WorkItem], size: int) -> Iterator[WorkItem]:
+    # Consecutive items become one item whose questions are asked in a single request
+    def make_batch(batch: List[WorkItem]) -> WorkItem:
+        return WorkItem(batch[0].model, batch[0].benchmark_id, batch[0].benchmark, None, None, None, batch[0].unit_id, batch)
+
+    batch = []
+    for item in items:
+        if isinstance(item, Barrier):
+            # The barrier may be waiting for the questions of the batch being filled
+            if batch:
+                yield make_batch(batch)
+                batch = []
+            yield item
+            continue
+        batch.append(item)
+        if len(batch) == size:
+            yield make_batch(batch)
+            batch = []
+    if batch:
+        yield make_batch(batch)
+
+
+def interleave(iterators: Iterable[Iterator]) -> Iterator:
+    # Lazy round-robin over several iterators, so all benchmarks of a lane progress evenly
+    return (item for batch in zip_longest(*iterators) for item in batch if item is not None)
+
+
+async def run_workers(workers: Iterable[Awaitable]):
+    tasks = [asyncio.ensure_future(worker) for worker in workers]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+class Scheduler:
+    """Runs question-level work items for all models with bounded concurrency.
+
+    Every model has its own lane, a lazy iterator of work items, and each lane
+    runs as many workers as that model's concurrency budget allows. A worker
+    only pulls the next item once its previous one is done, so the number of
+    items in memory stays at the number of workers however large the datasets
+    are. A throttled or slow model only slows its own lane, so wall-clock time
+    follows the slowest provider instead of the sum of all of them.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.progress_bar = None
+
+    def skip(self, count: int):
+        # Questions a lane will not hand out after all, e.g. when adaptive sampling stops a pair early
+        if self.progress_bar is not None and count:
+            self.progress_bar.total -= count
+            self.progress_bar.refresh()
+
+    async def run(self, lanes: Dict[str, Iterator[WorkItem]], handler: Callable, total: int = None):
+        progress_bar = tqdm(total=total, desc="Progress", unit="question")
+        self.progress_bar = progress_bar
+
+        async def worker(lane: Iterator[WorkItem]):
+            # Workers of a lane share its iterator, next() never awaits so each item is handed out once
+            while True:
+                # Lanes build their items when they are pulled, so the wait is the time it takes to produce the next one,
+                # e.g. building prompts or claiming a work unit
+                free_at = time.perf_counter()
+                item = next(lane, None)
+                if item is None:
+                    return
+                if isinstance(item, Barrier):
+                    await item.event.wait()
+                    continue
+                self.client.telemetry.observe_queue_wait(item.model.id, item.benchmark_id, time.perf_counter() - free_at)
+                await handler(item, progress_bar)
+
+        try:
+            await run_workers(
+                worker(lane)
+                for model_id, lane in lanes.items()
+                for _ in range(self.client.model_budget(model_id).max_concurrency)
+            )
+        finally:
+            progress_bar.close()
@@ -0,0 +1,209 @@
+import os
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, float("inf"))
+LABEL_NAMES = ("provider", "model", "benchmark")
+# Metric name, type, help text and PoolStats attribute of the HTTP connection pool metrics
+POOL_METRICS = (
+    ("benchmark_http_pool_requests_total", "counter", "HTTP requests sent through the pool", "requests"),
+    ("benchmark_http_pool_connections_total", "counter", "New connections opened by the pool", "new_connections"),
+    ("benchmark_http_pool_saturated_total", "counter", "Requests that had to wait for a free connection", "queued"),
+    ("benchmark_http_pool_max_in_flight", "gauge", "Peak number of concurrent requests", "max_in_flight"),
+    ("benchmark_http_pool_max_connections", "gauge", "Configured connection limit", "max_connections"),
+)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        if labels not in self.series:
+            self.series[labels] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        series = self.series[labels]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["counts"][i] += 1
+                break
+        series["sum"] += value
+        series["count"] += 1
+
+    def quantile(self, labels: Tuple[str, ...], q: float) -> Optional[float]:
+        # Upper bound of the bucket holding the q-th observation, good enough for a summary table
+        series = self.series.get(labels)
+        if not series or not series["count"]:
+            return None
+        rank = q * series["count"]
+        seen = 0
+        for bound, count in zip(self.buckets, series["counts"]):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.series = defaultdict(float)
+
+    def inc(self, labels: Tuple[str, ...], value: float = 1):
+        self.series[labels] += value
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+class Telemetry:
+    """Per-request latency, token and cost metrics for one suite run.
+
+    Every request is labelled by provider, model and benchmark. Metrics can be
+    written as a Prometheus text file for the node exporter's textfile
+    collector, and print_summary shows where wall-clock time and spend went.
+    """
+
+    def __init__(self, pricing: Dict[str, Dict[str, float]] = None):
+        # pricing maps a model id to USD per prompt and per completion token
+        self.pricing = pricing or {}
+        self.queue_wait = Histogram("benchmark_request_queue_wait_seconds", "Time a free scheduler worker waited for its lane to produce the next question")
+        self.limiter_wait = Histogram("benchmark_request_limiter_wait_seconds", "Time spent waiting for model and provider budgets")
+        self.response_time = Histogram("benchmark_request_duration_seconds", "Time from sending a request to receiving the response")
+        self.time_to_answer = Histogram("benchmark_time_to_answer_seconds", "Time from sending a streamed request to receiving the closing answer tag")
+        self.requests = Counter("benchmark_requests_total", "Completed requests by final HTTP status")
+        self.retries = Counter("benchmark_request_retries_total", "Retried request attempts")
+        self.cache_hits = Counter("benchmark_cache_hits_total", "Requests answered from the response cache")
+        self.coalesced = Counter("benchmark_requests_coalesced_total", "Queries that shared an identical in-flight request instead of sending their own")
+        self.rejected = Counter("benchmark_requests_rejected_total", "Requests failed without being sent because the model's circuit breaker was open")
+        self.prompt_tokens = Counter("benchmark_prompt_tokens_total", "Prompt tokens reported by the API")
+        self.completion_tokens = Counter("benchmark_completion_tokens_total", "Completion tokens reported by the API")
+        self.cost = Counter("benchmark_cost_usd_total", "Estimated spend in USD")
+        self.pools = []
+
+    def track_pools(self, pools):
+        # PoolStats of the HTTP transport, read when metrics are written
+        self.pools = list(pools)
+
+    @staticmethod
+    def labels(model: str, benchmark: str = None) -> Tuple[str, str, str]:
+        return model.split("/", 1)[0], model, benchmark or ""
+
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        prices = self.pricing.get(model)
+        if not prices:
+            return 0.0
+        return prompt_tokens * prices.get("prompt", 0.0) + completion_tokens * prices.get("completion", 0.0)
+
+    def observe_queue_wait(self, model: str, benchmark: str, seconds: float):
+        self.queue_wait.observe(self.labels(model, benchmark), seconds)
+
+    def observe_cache_hit(self, model: str, benchmark: str):
+        self.cache_hits.inc(self.labels(model, benchmark))
+
+    def observe_coalesced(self, model: str, benchmark: str):
+        self.coalesced.inc(self.labels(model, benchmark))
+
+    def observe_rejected(self, model: str, benchmark: str):
+        self.rejected.inc(self.labels(model, benchmark))
+
+    def observe_request(self, model: str, benchmark: str, limiter_wait: float, response_time: float, retries: int,
+                        status: int, usage=None, cost: float = None, time_to_answer: float = None):
+        labels = self.labels(model, benchmark)
+        self.limiter_wait.observe(labels, limiter_wait)
+        if response_time is not None:
+            self.response_time.observe(labels, response_time)
+        if time_to_answer is not None:
+            self.time_to_answer.observe(labels, time_to_answer)
+        self.requests.inc(labels + (str(status),))
+        self.retries.inc(labels, retries)
+        if usage is not None:
+            prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+            self.prompt_tokens.inc(labels, prompt_tokens)
+            self.completion_tokens.inc(labels, completion_tokens)
+            if cost is None:
+                cost = self.estimate_cost(model, prompt_tokens, completion_tokens)
+        if cost:
+            self.cost.inc(labels, cost)
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for histogram in (self.queue_wait, self.limiter_wait, self.response_time, self.time_to_answer):
+            lines.append(f"# HELP {histogram.name} {histogram.help_text}")
+            lines.append(f"# TYPE {histogram.name} histogram")
+            for labels, series in sorted(histogram.series.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, series["counts"]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    bucket_labels = format_labels(LABEL_NAMES, labels, 'le="' + le + '"')
+                    lines.append(f"{histogram.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{histogram.name}_sum{format_labels(LABEL_NAMES, labels)} {series['sum']:.6f}")
+                lines.append(f"{histogram.name}_count{format_labels(LABEL_NAMES, labels)} {series['count']}")
+        for counter in (self.requests, self.retries, self.cache_hits, self.coalesced, self.rejected, self.prompt_tokens, self.completion_tokens, self.cost):
+            label_names = LABEL_NAMES + ("status",) if counter is self.requests else LABEL_NAMES
+            lines.append(f"# HELP {counter.name} {counter.help_text}")
+            lines.append(f"# TYPE {counter.name} counter")
+            for labels, value in sorted(counter.series.items()):
+                lines.append(f"{counter.name}{format_labels(label_names, labels)} {value:g}")
+        for name, metric_type, help_text, attribute in POOL_METRICS if self.pools else ():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for pool in self.pools:
+                lines.append(f"{name}{format_labels(('pool',), (pool.name,))} {getattr(pool, attribute)}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        partial_path = path + ".part"
+        with open(partial_path, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(partial_path, path)
+        print(f"Metrics saved to {path}")
+
+    def print_summary(self):
+        rows = []
+        for labels in sorted(set(self.response_time.series) | set(self.cache_hits.series)):
+            series = self.response_time.series.get(labels, {"sum": 0.0, "count": 0})
+            rows.append((
+                labels[1], labels[2], series["count"], int(self.cache_hits.series.get(labels, 0)),
+                int(self.retries.series.get(labels, 0)), series["sum"],
+                self.response_time.quantile(labels, 0.5), self.response_time.quantile(labels, 0.95),
+                self.time_to_answer.quantile(labels, 0.5),
+                self.limiter_wait.series.get(labels, {"sum": 0.0})["sum"],
+                int(self.prompt_tokens.series.get(labels, 0) + self.completion_tokens.series.get(labels, 0)),
+                self.cost.series.get(labels, 0.0),
+            ))
+        for pool in self.pools:
+            if pool.requests:
+                print(f"HTTP pool {pool.name}: {pool.requests} requests over {pool.new_connections} connections, "
+                      f"peak {pool.max_in_flight} in flight, {pool.queued} waited for a free connection (limit {pool.max_connections})")
+        coalesced = int(sum(self.coalesced.series.values()))
+        if coalesced:
+            sent = int(sum(series["count"] for series in self.response_time.series.values()))
+            print(f"Coalesced {coalesced} identical queries into in-flight requests, "
+                  f"{coalesced / (coalesced + sent):.1%} of the {coalesced + sent} queries that missed the cache")
+        rejected = defaultdict(int)
+        for labels, count in self.rejected.series.items():
+            rejected[labels[1]] += int(count)
+        for model, count in sorted(rejected.items()):
+            print(f"Circuit breaker for {model} failed {count} requests without sending them")
+        if not rows:
+            return
+
+        header = f"{'model':<40} {'benchmark':<14} {'reqs':>6} {'cached':>6} {'retry':>5} {'api s':>9} {'p50':>6} {'p95':>6} {'ans p50':>7} {'wait s':>9} {'tokens':>10} {'cost $':>9}"
+        print(header)
+        print("-" * len(header))
+        for model, benchmark, count, cached, retries, total, p50, p95, answer_p50, waited, tokens, cost in sorted(rows, key=lambda row: -row[5]):
+            p50_text = f"{p50:g}" if p50 is not None else "-"
+            p95_text = f"{p95:g}" if p95 is not None else "-"
+            answer_text = f"{answer_p50:g}" if answer_p50 is not None else "-"
+            print(f"{model:<40} {benchmark:<14} {count:>6} {cached:>6} {retries:>5} {total:>9.1f} {p50_text:>6} {p95_text:>6} {answer_text:>7} {waited:>9.1f} {tokens:>10} {cost:>9.4f}")
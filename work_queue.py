@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+
+class WorkUnit:
+    def __init__(self, id: int, model: str, benchmark: str, start: int, stop: int, row_ids: List[str]):
+        self.id = id
+        self.model = model
+        self.benchmark = benchmark
+        # Position range in the benchmark's prompt table and the row ids in it that still need an answer
+        self.start = start
+        self.stop = stop
+        self.row_ids = row_ids
+
+
+class WorkQueue:
+    """SQLite queue of (model, benchmark, question chunk) units for sharded runs.
+
+    The coordinator stores the run plan and the units. Workers in other
+    processes, or on other hosts that can open the same file, claim units
+    with a lease. A unit whose worker died is handed out again once its lease
+    expires. Every worker appends its results to its own journal in
+    `shard_dir`, the coordinator merges them when the queue is drained.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 1800.0):
+        self.path = path
+        self.shard_dir = os.path.splitext(path)[0] + "_shards"
+        self.lease_seconds = lease_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # The default rollback journal instead of WAL, WAL does not work on network file systems
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS units ("
+            "id INTEGER PRIMARY KEY, model TEXT NOT NULL, benchmark TEXT NOT NULL, start INTEGER NOT NULL, stop INTEGER NOT NULL, "
+            "row_ids TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending', worker TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS units_model_status ON units (model, status)")
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same unit
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def create(self, plan: dict, units: Iterable[tuple]):
+        """Replace the queue's plan and units, units are (model, benchmark, start, stop, row_ids) tuples."""
+        shutil.rmtree(self.shard_dir, ignore_errors=True)
+        with self._transaction():
+            self.conn.execute("DELETE FROM meta")
+            self.conn.execute("DELETE FROM units")
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('plan', ?)", (json.dumps(plan),))
+            self.conn.executemany(
+                "INSERT INTO units (model, benchmark, start, stop, row_ids) VALUES (?, ?, ?, ?, ?)",
+                ((model, benchmark, start, stop, json.dumps(row_ids)) for model, benchmark, start, stop, row_ids in units),
+            )
+
+    def plan(self) -> dict:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'plan'").fetchone()
+        if row is None:
+            raise ValueError(f"{self.path} does not contain a sharded run")
+        return json.loads(row[0])
+
+    def claim(self, worker: str, model: str) -> Optional[WorkUnit]:
+        now = time.time()
+        with self._transaction():
+            row = self.conn.execute(
+                "SELECT id, model, benchmark, start, stop, row_ids FROM units "
+                "WHERE model = ? AND (status = 'pending' OR (status = 'claimed' AND lease_expires < ?)) ORDER BY id LIMIT 1",
+                (model, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE units SET status = 'claimed', worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker, now + self.lease_seconds, row[0]),
+            )
+        unit_id, model, benchmark, start, stop, row_ids = row
+        return WorkUnit(unit_id, model, benchmark, start, stop, json.loads(row_ids))
+
+    def complete(self, unit_id: int):
+        self.conn.execute("UPDATE units SET status = 'done', lease_expires = NULL WHERE id = ?", (unit_id,))
+
+    def release(self, worker: str):
+        # Hands a failed worker's unfinished units back without waiting for their leases
+        self.conn.execute("UPDATE units SET status = 'pending', worker = NULL, lease_expires = NULL WHERE worker = ? AND status = 'claimed'", (worker,))
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM units GROUP BY status").fetchall())
+
+    def finished(self) -> bool:
+        return self.conn.execute("SELECT COUNT(*) FROM units WHERE status != 'done'").fetchone()[0] == 0
+
+    def shard_journal_path(self, worker: str) -> str:
+        return os.path.join(self.shard_dir, f"{worker}.jsonl")
+
+    def shard_journal_paths(self) -> List[str]:
+        if not os.path.isdir(self.shard_dir):
+            return []
+        return sorted(os.path.join(self.shard_dir, name) for name in os.listdir(self.shard_dir) if name.endswith(".jsonl"))
+
+    def clear_shards(self):
+        shutil.rmtree(self.shard_dir, ignore_errors=True)
+
+    def close(self):
+        self.conn.close()